@@ -1,171 +1,209 @@
-import os, time, sys
-from schedulemanager import *
-import matplotlib.pyplot as plt
-import random, math
-
-
-
-NUM_CHANGES = 8
-
-def main(sm, temp = 10000, coolingRate = 0.005):
-
-    initTemp = temp
-    
-    trackEnergy = [] #this is only for graphing purposes later
-    trackTemp =[] #this is only for graphing purposes later
-    trackBest=[] #this is only for graphing purposes later
-
-    
-    ps = sm.create_default_schedule()
-
-    print("Starting annealing process.")
-    start_time = time.perf_counter()
-    
-    #calculate the energy
-    energy = ps.evaluate()#for graphing
-    trackEnergy.append(energy)#this is only for graphing purposes later
-    trackBest.append(energy)#this is only for graphing purposes later
-    trackTemp.append(temp)#this is only for graphing purposes later
-
-    #print(f"The inital rating of this schedule = {energy}")
-    
-
-    #this is the best so far
-    best_schedule = ps
-    best_energy = energy
-    
-    #slowly "cool" the system
-    while( temp >1):
-        new_schedule = sm.successor(ps, NUM_CHANGES)
-        
-        #get current energy
-        current_energy = ps.evaluate()
-        new_energy = new_schedule.evaluate()
-        
-        #decide if should accept the neighborEnergy
-        '''If it is not better than the current energy, then make it the current state
-        with probability p as defined by protocal.  
-        This step is usually implemented by invoking a random number generator to produce
-        a number in the range of [0,1].  
-        If that number is less than p, then the move is accepted.  
-        Otherwise, do nothing.
-        '''
-        if(acceptanceProb(current_energy, new_energy, temp) > random.random()):
-            ps = new_schedule
-            
-        #keep track of best so far
-        if(new_energy < best_energy):
-            best_schedule = new_schedule
-            best_energy = new_energy
-            
-        trackEnergy.append(new_energy) #for graphing
-        trackBest.append(best_energy) #for graphing
-        trackTemp.append(temp) #for graphing
-        #cool system
-        temp *= 1-coolingRate
-
-    end_time = time.perf_counter()
-
-    t_diff = end_time - start_time
-
-
-    print("Annealing completed.")
-    print(f"Took {t_diff} seconds.")
-    print(f"Best score was {-best_energy:.2f} points.")
-
-    #make the graphs
-    plotDistanceChanges(trackTemp, trackEnergy, "tracking energy over temp change")
-    plotDistanceChanges(trackTemp, trackBest, "tracking best energy over temp change")
-    
-    return best_schedule, best_energy, t_diff
-    
-def acceptanceProb(energy, newEnergy, temperature):
-    '''This calculation determines if we accept the new state or not
-       If the new state is better - we always accept items - return 1
-       If the new state is not better - we accept it based on a probability
-    '''
-    if(newEnergy< energy):
-        #print("new is better")
-        return 1.0
-    return math.exp((energy - newEnergy)/temperature)
-
-def plotDistanceChanges(dist, temp, title):
-    '''
-        This makes a plot to show distance changes while the
-        temperature changes
-    '''
-    plt.title(title)
-    plt.xlabel('temperature')
-    plt.ylabel('distance')
-    plt.plot(dist, temp, "ro-")
-    plt.show()
-
-
-def testingSuite():
-    import itertools as it
-
-    sm = ScheduleManager()
-    try:
-        assert sm.initialize()        
-        assert sm.load_msc_schedule()
-        assert sm.import_worker_schedules()
-    except AssertionError as ae:
-        print("System aborting...")
-        time.sleep(10)
-        return
-
-    temps = [x*x * 1000 for x in range(1,11)]
-    coolingRates = [0.001, 0.005,0.01,0.02]
-
-    iterations = 10
-
-    print(f"Launching {len(temps)*len(coolingRates)} experiments for {iterations} iterations each.")
-
-    min_energy = float("inf")
-    best_params = None
-    start_time = time.time()
-    for init_temp, cooling_rate in it.product(temps,coolingRates):
-        accumTime = 0
-        
-        for i in range(iterations):
-            
-            best_schedule, best_energy, annealing_time = main(sm, init_temp, cooling_rate)
-            
-            if best_energy < min_energy:
-                best_params = (init_temp, cooling_rate)
-                min_energy = best_energy
-
-            accumTime += annealing_time
-
-        print(f"T: {init_temp} \t CR: {cooling_rate} \t Mean Run Time: {accumTime/iterations:.4f}")
-    print("FINAL REPORT:")
-    print(f"Params yielding the best score: {best_params}")
-    print(f"Best score: {-min_energy:.2f}")
-    end_time = time.time()
-    t_diff = end_time - start_time
-
-    print(f"We conducted {len(temps)*len(coolingRates)} experiments for {iterations} iterations each.")
-    print(f"Experimentation took {t_diff:.2f} seconds.")
-
-
-if __name__ == "__main__":
-
-    sm = ScheduleManager()
-    try:
-        assert sm.initialize()        
-        assert sm.load_msc_schedule()
-        assert sm.import_worker_schedules()
-    except AssertionError as ae:
-        print("System aborting...")
-        time.sleep(10)
-
-
-    best_schedule, best_energy, annealing_time = main(sm)
-    sm.write_schedule_to_spreadsheet(best_schedule)
-    sm.write_constraints_to_spreadsheet()
-    best_schedule.report()
-    best_schedule.write_report()
-    time.sleep(100)
-
-    
-
+import os, time, sys, argparse, random
+from schedulemanager import *
+from annealing import *
+from tempering import parallel_tempering, REPLICAS
+from flowsolver import solve
+from tabusearch import tabu_search, TABU_ITERATIONS
+from warmstart import repair
+from watcher import watch, WATCH_INTERVAL, REFRESH_INTERVAL
+from moves import MoveSet
+from telemetry import RunStats, capture, STREAM_INTERVAL
+from tracing import TraceRecorder
+from export import Exporter, EXPORT_FORMATS, EXPORT_BASENAME
+from sweep import run_sweep, summarize, SWEEP_RESULTS_FILENAME
+
+
+
+PARALLEL_CHAINS = 1 #more than 1 anneals that many chains at once, in parallel, and keeps the best
+PARALLEL_TEMPERING = False #True searches with replica exchange across all cores instead
+TARGETED_MOVES = False #True anneals with the targeted move set instead of only rerolling shifts
+EXACT_SOLVER = False #True solves the assignment exactly as a min cost flow, then polishes it by annealing
+TABU_SEARCH = False #True searches with tabu search instead of annealing
+
+def testingSuite():
+    """
+    Sweeps the annealer's starting temperature and cooling rate across all
+    cores. Results are saved as they come in, so rerunning an interrupted
+    sweep picks up where it left off.
+    """
+    sm = ScheduleManager()
+    try:
+        assert sm.initialize()        
+        assert sm.load_msc_schedule()
+        assert sm.import_worker_schedules()
+    except AssertionError as ae:
+        print("System aborting...")
+        time.sleep(10)
+        return
+
+    start_time = time.time()
+
+    records = run_sweep(sm)
+    summarize(records)
+
+    end_time = time.time()
+    t_diff = end_time - start_time
+
+    print(f"The sweep took {t_diff:.2f} seconds, results are in '{SWEEP_RESULTS_FILENAME}'.")
+
+
+def parse_arguments(argv = None):
+    """
+    Reads the command line. With no arguments, the script behaves like it
+    always has when double clicked: plots pop up, and the window stays open
+    for a while at the end so the report can be read.
+    """
+    parser = argparse.ArgumentParser(description = "Generates a draft MSC tutor schedule from the tutor availability forms.")
+    parser.add_argument("--folder", default = ".",
+                        help = f"folder holding '{MSC_WORKERS_NEEDED_FILENAME}', the output templates, and the '{AVAILABILITY_FOLDER_NAME}' folder")
+    parser.add_argument("--schedule-out", help = f"where to save the schedule (default: over '{MSC_TUTOR_SCHEDULE_FILENAME}' in the folder)")
+    parser.add_argument("--constraints-out", help = f"where to save the constraints (default: over '{MSC_CONSTRAINTS_FILENAME}' in the folder)")
+    parser.add_argument("--report-out", help = f"where to save the report (default: '{REPORT_FILENAME}' in the folder)")
+    parser.add_argument("--export", nargs = "+", choices = EXPORT_FORMATS, default = ["xlsx"],
+                        help = "formats to save the results in: the usual workbooks and report (xlsx), or files for other systems to read")
+    parser.add_argument("--export-out", help = f"what the json, csv and parquet files are named after (default: '{EXPORT_BASENAME}' in the folder)")
+    parser.add_argument("--temp", type = float, help = "starting annealing temperature (default: 10000, or the repair's own with --warm-start)")
+    parser.add_argument("--cooling-rate", type = float,
+                        help = "fraction the temperature drops each step (default: 0.005, or the repair's own with --warm-start)")
+    parser.add_argument("--seed", type = int, help = "random seed, for reproducible runs")
+    parser.add_argument("--time-budget", type = float, help = "stop searching after this many seconds")
+    parser.add_argument("--max-evaluations", type = int, help = "stop annealing after evaluating this many schedules")
+    parser.add_argument("--stagnation", type = int, help = "stop annealing after this many steps without a new best")
+    parser.add_argument("--target-gaps", type = int, help = "stop annealing once the best schedule has at most this many gaps")
+    parser.add_argument("--target-score", type = float, help = "stop annealing once the best schedule scores at least this much")
+    parser.add_argument("--moves", action = "store_true", default = TARGETED_MOVES,
+                        help = "anneal with targeted moves (swaps, hand offs, gap fills...) instead of only rerolling shifts")
+    parser.add_argument("--candidates", type = int, metavar = "K",
+                        help = "each annealing step, draw K rerolls and score them together on the numpy engine, then make one of them")
+    parser.add_argument("--pick", choices = BATCH_RULES, default = "metropolis",
+                        help = "which of the K candidates a step makes: the first the Metropolis rule accepts, or the best, if it accepts it")
+    parser.add_argument("--chains", type = int, default = PARALLEL_CHAINS, help = "independent annealing chains to run in parallel")
+    parser.add_argument("--tempering", action = "store_true", default = PARALLEL_TEMPERING, help = "search with parallel tempering instead")
+    parser.add_argument("--replicas", type = int, default = REPLICAS, help = "temperatures on the parallel tempering ladder")
+    parser.add_argument("--exact", action = "store_true", default = EXACT_SOLVER,
+                        help = "solve the assignment exactly as a min cost flow, then polish it by annealing")
+    parser.add_argument("--tabu", action = "store_true", default = TABU_SEARCH,
+                        help = "search with tabu search instead: steadier results from run to run")
+    parser.add_argument("--tabu-iterations", type = int, default = TABU_ITERATIONS, help = "steps of tabu search to take")
+    parser.add_argument("--warm-start", nargs = "?", const = "", metavar = "SCHEDULE",
+                        help = f"repair the current schedule (default: '{MSC_TUTOR_SCHEDULE_FILENAME}' in the folder) to fit changed "
+                               "availability forms, moving as few people as possible, instead of starting over")
+    parser.add_argument("--watch", action = "store_true",
+                        help = "keep running, rereading forms as they're added, changed or removed, and keep a draft schedule current")
+    parser.add_argument("--watch-interval", type = float, default = WATCH_INTERVAL, help = "seconds between looks at the availability folder")
+    parser.add_argument("--refresh-interval", type = float, default = REFRESH_INTERVAL, help = "seconds between rewrites of the draft in watch mode")
+    parser.add_argument("--checkpoint", help = "save the annealing run to this file every so often, so it can be resumed if cut short")
+    parser.add_argument("--checkpoint-interval", type = float, default = CHECKPOINT_INTERVAL, help = "seconds between checkpoints")
+    parser.add_argument("--resume", help = "carry on the annealing run saved in this checkpoint, exactly where it left off; "
+                                           "stopping criteria given here replace the saved ones")
+    parser.add_argument("--trace", help = "save the annealing trace to this CSV file as it goes, to graph with tracing.py; "
+                                          "with --chains, each chain saves its own, named after its seed")
+    parser.add_argument("--trace-every", type = int, default = 1, help = "only trace every this many steps")
+    parser.add_argument("--trace-improvements", action = "store_true", help = "only trace the steps that find a new best")
+    parser.add_argument("--plot-dir", help = "save the annealing graphs into this folder instead of showing them")
+    parser.add_argument("--stats", help = "save the annealing run's counters and timers to this file as JSON (not for --chains, --tempering, --tabu or --watch)")
+    parser.add_argument("--stats-stream", help = "append a snapshot of the counters and timers to this file every so often while annealing")
+    parser.add_argument("--stats-interval", type = float, default = STREAM_INTERVAL, help = "seconds between streamed snapshots")
+    parser.add_argument("--profile", help = "run the search under cProfile and save the stats to this file")
+    parser.add_argument("--trace-memory", help = "trace memory use during the search and save where it went to this file")
+    parser.add_argument("--no-cache", action = "store_true", help = f"reread every spreadsheet instead of using '{CACHE_FILENAME}'")
+    parser.add_argument("--batch", action = "store_true",
+                        help = "run non-interactively: never show plots or wait before exiting, for cron and batch jobs")
+    args = parser.parse_args(argv)
+    if args.candidates is not None and args.moves:
+        parser.error("--candidates draws rerolls only, so it can't be used with --moves")
+    single_run = not args.watch and (args.resume or args.warm_start is not None
+                                     or not (args.tempering or (not args.exact and (args.tabu or args.chains > 1))))
+    if (args.stats or args.stats_stream) and not single_run:
+        parser.error("--stats and --stats-stream measure a single annealing run, so they can't be used with --chains, --tempering, --tabu or --watch")
+    if args.replicas < 2:
+        parser.error("--replicas needs at least 2 temperatures for the replicas to swap between")
+    if args.warm_start is None or args.watch: #the warm start keeps its own defaults for what isn't given
+        args.temp = 10000 if args.temp is None else args.temp
+        args.cooling_rate = 0.005 if args.cooling_rate is None else args.cooling_rate
+    return args
+
+
+if __name__ == "__main__":
+
+    args = parse_arguments()
+
+    sm = ScheduleManager(args.folder, use_cache = not args.no_cache)
+
+    if args.watch:
+        if os.path.isdir(sm.directory): #forms can come in while watching, so an empty or missing folder is fine
+            os.makedirs(sm.path(AVAILABILITY_FOLDER_NAME), exist_ok = True)
+        if not sm.initialize(min_forms = 0) or not sm.load_msc_schedule():
+            print("System aborting...")
+            sys.exit(1)
+        watch(sm, args.schedule_out, args.constraints_out, args.report_out, args.temp, args.cooling_rate,
+              args.watch_interval, args.refresh_interval, seed = args.seed, moves = MoveSet() if args.moves else None)
+        sys.exit(0)
+
+    try:
+        assert sm.initialize()        
+        assert sm.load_msc_schedule()
+        assert sm.import_worker_schedules()
+    except AssertionError as ae:
+        print("System aborting...")
+        if not args.batch:
+            time.sleep(10)
+        sys.exit(1)
+
+
+    stopping = dict(max_evaluations = args.max_evaluations, stagnation = args.stagnation,
+                    target_gaps = args.target_gaps, target_score = args.target_score)
+    options = dict(stopping, moves = MoveSet() if args.moves else None)
+    if args.candidates is not None:
+        options.update(batch_size = args.candidates, batch_rule = args.pick, dense = True)
+
+    stats = RunStats(args.stats_stream, args.stats_interval) #filled in by single annealing runs, including the exact solver's polish and the warm start's repair
+    trace_options = dict(every = args.trace_every, improvements_only = args.trace_improvements)
+
+    with capture(args.profile, args.trace_memory):
+        if args.resume:
+            stopping = {option: value for option, value in stopping.items() if value is not None}
+            if args.time_budget is not None:
+                stopping["time_budget"] = args.time_budget
+            annealer = resume(sm, args.resume, stats, args.checkpoint_interval, **stopping)
+            best_schedule, best_energy, annealing_time, evaluations = finish(annealer, show_plots = not args.batch, plot_dir = args.plot_dir)
+        elif args.warm_start is not None:
+            repair_options = dict(stopping, temp = args.temp, coolingRate = args.cooling_rate, time_budget = args.time_budget, stats = stats)
+            repair_options = {option: value for option, value in repair_options.items() if value is not None}
+            if args.moves:
+                repair_options["moves"] = MoveSet()
+            best_schedule, best_energy, annealing_time = repair(sm, args.warm_start or None, seed = args.seed, **repair_options)
+        elif args.tempering:
+            best_schedule, best_energy, annealing_time = parallel_tempering(sm, args.replicas, time_budget = args.time_budget, seed = args.seed)
+        elif args.exact:
+            best_schedule, best_energy, annealing_time = solve(sm, time_budget = args.time_budget, stats = stats, seed = args.seed,
+                                                               trace = TraceRecorder(stream_fn = args.trace, **trace_options), **options)
+        elif args.tabu:
+            best_schedule, best_energy, annealing_time = tabu_search(sm, args.tabu_iterations, time_budget = args.time_budget,
+                                                                     stagnation = args.stagnation, seed = args.seed)
+        elif args.chains > 1:
+            chain_seeds = random.Random(args.seed) #the chains' own seeds follow from --seed
+            seeds = [chain_seeds.randrange(2**32) for i in range(args.chains)]
+            best_schedule, best_energy, annealing_time = multistart(sm, args.chains, args.temp, args.cooling_rate, seeds, args.time_budget,
+                                                                    args.trace, trace_options, **options)
+        else:
+            best_schedule, best_energy, annealing_time = main(sm, args.temp, args.cooling_rate, show_plots = not args.batch,
+                                                              plot_dir = args.plot_dir, time_budget = args.time_budget, stats = stats, seed = args.seed,
+                                                              checkpoint_fn = args.checkpoint, checkpoint_interval = args.checkpoint_interval,
+                                                              trace = TraceRecorder(stream_fn = args.trace, **trace_options), **options)
+
+    if args.stats:
+        stats.write_json(args.stats)
+
+    exporter = Exporter(sm)
+    for fmt in args.export:
+        try:
+            exporter.write(best_schedule, fmt, args.export_out, args.schedule_out, args.constraints_out, args.report_out)
+        except ValueError as ve:
+            print(ve)
+    best_schedule.report()
+    if not args.batch:
+        time.sleep(100)
+
+    
+
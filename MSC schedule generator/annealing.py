@@ -0,0 +1,481 @@
+"""
+The simulated annealing search over PotentialSchedules, on its own or as
+several independent chains spread over a process pool.
+"""
+import os, time, threading, gzip, pickle
+from concurrent.futures import ProcessPoolExecutor
+from schedulemanager import *
+from denseschedule import DenseProblem
+from telemetry import RunStats
+from tracing import TraceRecorder
+import random, math
+
+
+
+NUM_CHANGES = 8
+CHECKPOINT_INTERVAL = 300 #seconds between checkpoints, when checkpointing
+BATCH_RULES = ["metropolis", "best"] #how a step picks from a batch of candidates
+
+# what a checkpoint saves of an Annealer, besides its random state and time spent so far
+CHECKPOINT_FIELDS = ["initTemp", "temp", "coolingRate", "moves", "batch_size", "batch_rule",
+                     "time_budget", "max_evaluations", "stagnation", "target_gaps", "target_score",
+                     "ps", "best_schedule", "best_energy", "evaluations", "steps", "steps_since_best", "trace"]
+
+def main(sm, temp = 10000, coolingRate = 0.005, dense = False, show_plots = True, verbose = True, plot_dir = None, time_budget = None, stats = None, **options):
+    best_schedule, best_energy, t_diff, evaluations = anneal(sm, temp, coolingRate, dense, show_plots, verbose, plot_dir, time_budget, stats, **options)
+    return best_schedule, best_energy, t_diff
+
+def anneal(sm, temp = 10000, coolingRate = 0.005, dense = False, show_plots = True, verbose = True, plot_dir = None, time_budget = None, stats = None, **options):
+    """
+    The annealing run behind main(). Also returns how many schedules were
+    evaluated, for throughput figures.
+
+    With plot_dir, the graphs are saved there as images instead of shown.
+    time_budget and any other Annealer options, like the stopping criteria
+    or a move set, are passed on to Annealer.
+    Pass in a telemetry.RunStats as stats to keep the run's counters and
+    timers, eg. to stream them or save them as JSON.
+    Pass a seed (or an rng) in options for a repeatable run, and a
+    checkpoint_fn to be able to resume() it if it's cut short.
+    """
+
+    annealer = Annealer(sm, temp, coolingRate, dense, time_budget = time_budget, stats = stats, **options)
+    return finish(annealer, show_plots, verbose, plot_dir)
+
+def finish(annealer, show_plots = True, verbose = True, plot_dir = None):
+    """
+    Runs an Annealer to the end, reports on it and graphs it, the same way
+    for a fresh run and a resumed one. Returns the same as anneal().
+    """
+    if verbose:
+        print("Starting annealing process.")
+
+    best_schedule, best_energy, t_diff = annealer.run()
+
+    if verbose:
+        print(f"Annealing completed: {annealer.stop_reason}.")
+        print(f"Took {t_diff} seconds.")
+        print(f"Best score was {-best_energy:.2f} points.")
+        print(annealer.stats.report())
+
+    #make the graphs
+    trace = annealer.trace
+    if plot_dir is not None:
+        plotDistanceChanges(trace.column("temp"), trace.column("energy"), "tracking energy over temp change", os.path.join(plot_dir, "energy over temp.png"))
+        plotDistanceChanges(trace.column("temp"), trace.column("best"), "tracking best energy over temp change", os.path.join(plot_dir, "best energy over temp.png"))
+    elif show_plots:
+        plotDistanceChanges(trace.column("temp"), trace.column("energy"), "tracking energy over temp change")
+        plotDistanceChanges(trace.column("temp"), trace.column("best"), "tracking best energy over temp change")
+    
+    return best_schedule, best_energy, t_diff, annealer.evaluations
+
+class Annealer:
+    """
+    One simulated annealing run over a schedule, a step at a time.
+
+    Cooling stops once the temperature drops to 1, or earlier when any of
+    the optional stopping criteria is met:
+        time_budget      seconds of annealing
+        max_evaluations  schedules evaluated
+        stagnation       steps in a row without a new best
+        target_gaps      the best schedule has at most this many gaps...
+        target_score     ...and/or scores at least this much
+    stop() can also be called at any point, eg. from another thread.
+
+    The run is anytime: best() hands back the best schedule so far whenever
+    it's asked, including while run() is still going in another thread.
+
+    Counters and timers for the run are kept in stats, a telemetry.RunStats,
+    and the energy and temperature as it goes in trace, a
+    tracing.TraceRecorder.
+
+    Each step rerolls NUM_CHANGES shifts per campus, unless a moves.MoveSet
+    is given as moves, in which case each step makes one of its targeted
+    moves instead. With a batch_size, each step instead draws that many
+    rerolls and scores them together (in one vectorized pass, when dense),
+    then makes one of them, picked by batch_rule:
+        metropolis  the first the Metropolis rule accepts, in turn
+        best        the best of them, if the Metropolis rule accepts it
+
+    Every random choice of the run, from the default schedule on, is drawn
+    from rng, a random.Random, which is made from seed if not given: the
+    same seed always makes the same run. With checkpoint_fn, everything
+    needed to carry on is saved there every checkpoint_interval seconds and
+    when the run ends, and resume() picks the run back up from it exactly
+    where it left off.
+    """
+
+    def __init__(self, sm, temp = 10000, coolingRate = 0.005, dense = False, ps = None,
+                 time_budget = None, max_evaluations = None, stagnation = None, target_gaps = None, target_score = None, stats = None,
+                 moves = None, batch_size = None, batch_rule = "metropolis",
+                 seed = None, rng = None, checkpoint_fn = None, checkpoint_interval = CHECKPOINT_INTERVAL, trace = None):
+        if batch_size is not None and moves is not None:
+            raise ValueError("Batches are made of rerolls only: give a batch_size or moves, not both.")
+        if batch_rule not in BATCH_RULES:
+            raise ValueError(f"Unknown batch rule {batch_rule}: pick one of {', '.join(BATCH_RULES)}.")
+        self.sm = sm
+        self.rng = rng if rng is not None else random.Random(seed)
+        self.initTemp = temp
+        self.temp = temp
+        self.coolingRate = coolingRate
+        self.moves = moves
+        self.batch_size = batch_size
+        self.batch_rule = batch_rule
+
+        self.time_budget = time_budget
+        self.max_evaluations = max_evaluations
+        self.stagnation = stagnation
+        self.target_gaps = target_gaps
+        self.target_score = target_score
+
+        if ps is None:
+            ps = sm.create_default_schedule(self.rng)
+        if dense: #score on the numpy engine instead, for big rosters
+            ps = DenseProblem(sm).from_potential(ps)
+        self.ps = ps
+
+        #calculate the energy
+        energy = ps.evaluate()
+        self.evaluations = 1
+        self.steps = 0
+        self.steps_since_best = 0
+
+        self.trace = trace if trace is not None else TraceRecorder() #this is only for graphing purposes later
+        self.trace.record(0, temp, energy, energy)
+
+        #this is the best so far
+        self.lock = threading.Lock()
+        self.best_schedule = ps.copy()
+        self.best_energy = energy
+
+        self.stats = stats if stats is not None else RunStats()
+        self.checkpoint_fn = checkpoint_fn
+        self.checkpoint_interval = checkpoint_interval
+        self.elapsed_before = 0 #seconds spent before the run was last resumed
+        self.start_time = None
+        self.stop_requested = False
+        self.stop_reason = None
+
+    def best(self):
+        """
+        Returns (a copy of the best schedule so far, its energy).
+        """
+        with self.lock:
+            return self.best_schedule.copy(), self.best_energy
+
+    def stop(self):
+        """
+        Asks a running run() to stop after its current step.
+        """
+        self.stop_requested = True
+
+    def elapsed(self):
+        if self.start_time is None:
+            return self.elapsed_before
+        return time.perf_counter() - self.start_time
+
+    def save_checkpoint(self, fn = None):
+        """
+        Saves the state of the run to fn (or checkpoint_fn) as a compressed
+        pickle. The old checkpoint is only replaced once the new one is
+        written, so a run killed mid save still has the last one.
+        """
+        fn = fn or self.checkpoint_fn
+        self.trace.flush() #so the streamed trace is as far along as the checkpoint
+        state = {field: getattr(self, field) for field in CHECKPOINT_FIELDS}
+        state["rng"] = self.rng.getstate()
+        state["elapsed"] = self.elapsed()
+
+        with gzip.open(fn + ".tmp", "wb") as f:
+            pickle.dump(state, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(fn + ".tmp", fn)
+
+    def check_stop(self):
+        """
+        Returns why the run should stop now, or None to keep going.
+        """
+        if self.stop_requested:
+            return "stopped"
+        if self.temp <= 1:
+            return "cooled"
+        if self.time_budget is not None and self.elapsed() > self.time_budget:
+            return "time budget used up"
+        if self.max_evaluations is not None and self.evaluations >= self.max_evaluations:
+            return "evaluation budget used up"
+        if self.stagnation is not None and self.steps_since_best >= self.stagnation:
+            return f"no improvement in {self.stagnation} steps"
+        if self.target_gaps is not None or self.target_score is not None:
+            reached = True
+            if self.target_gaps is not None:
+                reached = reached and self.best_schedule.count_gaps() <= self.target_gaps
+            if self.target_score is not None:
+                reached = reached and -self.best_energy >= self.target_score
+            if reached:
+                return "target reached"
+        return None
+
+    def step(self):
+        """
+        Changes the current schedule once, keeps or undoes the change by the
+        Metropolis rule, and cools the system. Where the time goes is
+        recorded in self.stats.
+        """
+        if self.batch_size is not None:
+            return self.batch_step()
+
+        sm = self.sm
+        ps = self.ps
+        clock = time.perf_counter
+
+        #get current energy
+        current_energy = ps.evaluate()
+
+        #change the schedule in place, remembering how to undo it
+        started = clock()
+        if self.moves is None:
+            sm.reroll(ps, NUM_CHANGES, self.rng)
+            move = "reroll"
+        else:
+            move = self.moves.propose(sm, ps, NUM_CHANGES, self.rng)
+        rerolled = clock()
+        new_energy = ps.evaluate()
+        evaluated = clock()
+        self.evaluations += 1
+        
+        #keep track of best so far
+        if(new_energy < self.best_energy):
+            best_schedule = ps.copy()
+            with self.lock:
+                self.best_schedule = best_schedule
+                self.best_energy = new_energy
+            self.steps_since_best = 0
+            self.stats.record_improvement(self.temp, new_energy)
+        else:
+            self.steps_since_best += 1
+
+        #decide if should accept the neighborEnergy
+        '''If it is not better than the current energy, then make it the current state
+        with probability p as defined by protocal.  
+        This step is usually implemented by invoking a random number generator to produce
+        a number in the range of [0,1].  
+        If that number is less than p, then the move is accepted.  
+        Otherwise, undo it.
+        '''
+        decided = clock()
+        accepted = acceptanceProb(current_energy, new_energy, self.temp) > self.rng.random()
+        if accepted:
+            ps.commit_move()
+        else:
+            ps.revert_move()
+        resolved = clock()
+
+        self.steps += 1
+        self.trace.record(self.steps, self.temp, new_energy, self.best_energy) #for graphing
+
+        self.stats.record_step(self.temp, accepted, rerolled - started, evaluated - rerolled,
+                               resolved - decided, decided - evaluated + clock() - resolved, move)
+        #cool system
+        self.temp *= 1-self.coolingRate
+
+    def batch_step(self):
+        """
+        step(), for a batch of batch_size rerolls drawn and scored together.
+        The trace records the energy of the candidate made, or of the best
+        one if none was.
+        """
+        sm = self.sm
+        ps = self.ps
+        clock = time.perf_counter
+
+        current_energy = ps.evaluate()
+
+        started = clock()
+        candidates = sm.propose_batch(ps, self.batch_size, NUM_CHANGES, self.rng)
+        rerolled = clock()
+        energies = ps.score_moves(candidates)
+        evaluated = clock()
+        self.evaluations += len(candidates)
+
+        best = min(range(len(energies)), key = energies.__getitem__)
+        if energies[best] < self.best_energy:
+            ps.make_move(candidates[best])
+            best_schedule = ps.copy()
+            ps.revert_move()
+            with self.lock:
+                self.best_schedule = best_schedule
+                self.best_energy = energies[best]
+            self.steps_since_best = 0
+            self.stats.record_improvement(self.temp, energies[best])
+        else:
+            self.steps_since_best += 1
+
+        decided = clock()
+        if self.batch_rule == "best":
+            tried = [best]
+        else:
+            tried = range(len(candidates))
+        chosen = next((i for i in tried if acceptanceProb(current_energy, energies[i], self.temp) > self.rng.random()), None)
+        accepted = chosen is not None
+        if accepted:
+            ps.make_move(candidates[chosen])
+            ps.commit_move()
+        resolved = clock()
+
+        self.steps += 1
+        self.trace.record(self.steps, self.temp, energies[chosen if accepted else best], self.best_energy)
+
+        self.stats.record_step(self.temp, accepted, rerolled - started, evaluated - rerolled,
+                               resolved - decided, decided - evaluated + clock() - resolved, "reroll batch", len(candidates))
+        self.temp *= 1-self.coolingRate
+
+    def run(self):
+        """
+        Steps until a stopping criterion is met. Returns the same as main():
+        best schedule, best energy, and the time taken.
+        """
+        self.start_time = time.perf_counter() - self.elapsed_before
+        self.stats.start()
+        last_checkpoint = time.perf_counter()
+
+        #slowly "cool" the system
+        while True:
+            self.stop_reason = self.check_stop()
+            if self.stop_reason is not None:
+                break
+            self.step()
+
+            if self.checkpoint_fn is not None and time.perf_counter() - last_checkpoint >= self.checkpoint_interval:
+                self.save_checkpoint()
+                last_checkpoint = time.perf_counter()
+
+        if self.checkpoint_fn is not None:
+            self.save_checkpoint()
+        self.trace.flush()
+        if self.stats.stream_fn is not None:
+            self.stats.stream()
+
+        return self.best_schedule, self.best_energy, self.elapsed()
+    
+def resume(sm, fn, stats = None, checkpoint_interval = CHECKPOINT_INTERVAL, **options):
+    """
+    Rebuilds the Annealer saved in the checkpoint fn, ready to run() on from
+    where it was saved, on the same ScheduleManager it was started with. It
+    goes on checkpointing to fn. Any stopping criteria given in options,
+    eg. a bigger time_budget, replace the saved ones.
+    """
+    with gzip.open(fn, "rb") as f:
+        state = pickle.load(f)
+
+    annealer = Annealer(sm, state["initTemp"], state["coolingRate"], ps = state["ps"], stats = stats,
+                        checkpoint_fn = fn, checkpoint_interval = checkpoint_interval)
+    for field in CHECKPOINT_FIELDS:
+        if field in state: #checkpoints from before a field was added go without it
+            setattr(annealer, field, state[field])
+    for option, value in options.items():
+        setattr(annealer, option, value)
+    annealer.rng.setstate(state["rng"])
+    annealer.elapsed_before = state["elapsed"]
+    annealer.trace.truncate_stream()
+    return annealer
+
+def acceptanceProb(energy, newEnergy, temperature):
+    '''This calculation determines if we accept the new state or not
+       If the new state is better - we always accept items - return 1
+       If the new state is not better - we accept it based on a probability
+    '''
+    if(newEnergy< energy):
+        #print("new is better")
+        return 1.0
+    return math.exp((energy - newEnergy)/temperature)
+
+def plotDistanceChanges(dist, temp, title, fn = None):
+    '''
+        This makes a plot to show distance changes while the
+        temperature changes. It's saved to fn if given, otherwise
+        shown in a window.
+
+        matplotlib is only imported here, so runs without plots
+        never pay for it.
+    '''
+    if fn is None:
+        import matplotlib.pyplot as plt
+        plt.title(title)
+        plt.xlabel('temperature')
+        plt.ylabel('distance')
+        plt.plot(dist, temp, "r-")
+        plt.show()
+        return
+
+    # no pyplot, so no GUI backend is needed to save
+    from matplotlib.figure import Figure
+    fig = Figure()
+    ax = fig.subplots()
+    ax.set_title(title)
+    ax.set_xlabel('temperature')
+    ax.set_ylabel('distance')
+    ax.plot(dist, temp, "r-")
+    fig.savefig(fn)
+
+
+shared_manager = None #the ScheduleManager every chain in a worker process anneals with
+
+def share_manager(sm):
+    """
+    Process pool initializer: gives each worker process its own copy of the
+    parsed ScheduleManager once, instead of sending it along with every chain.
+    """
+    global shared_manager
+    shared_manager = sm
+
+def chain_trace_fn(trace_fn, seed):
+    """
+    Where a chain's trace goes: trace_fn, with the chain's seed added to the name.
+    """
+    root, ext = os.path.splitext(trace_fn)
+    return f"{root} {seed}{ext}"
+
+def run_chain(seed, temp, coolingRate, time_budget = None, options = {}, trace_fn = None, trace_options = {}):
+    """
+    Runs one annealing chain in a worker process, seeded so it can be rerun.
+    With trace_fn, its trace is streamed to a file of its own (see
+    chain_trace_fn), recorded with the TraceRecorder options in trace_options.
+    """
+    if trace_fn is not None:
+        options = dict(options, trace = TraceRecorder(stream_fn = chain_trace_fn(trace_fn, seed), **trace_options))
+    best_schedule, best_energy, t_diff = main(shared_manager, temp, coolingRate, show_plots = False, verbose = False,
+                                              time_budget = time_budget, seed = seed, **options)
+    return seed, best_schedule, best_energy, t_diff
+
+def multistart(sm, n_chains = os.cpu_count(), temp = 10000, coolingRate = 0.005, seeds = None, time_budget = None,
+               trace_fn = None, trace_options = {}, **options):
+    """
+    Runs n_chains independent annealing chains with distinct seeds across a
+    process pool, reports on each, and returns the best of them the same way
+    main() does: best schedule, best energy, and the time taken. Each chain
+    runs with the same Annealer options, eg. its own stopping criteria.
+    With trace_fn, every chain's trace is saved, to compare them afterwards.
+    """
+    if seeds is None:
+        seeds = [random.randrange(2**32) for i in range(n_chains)]
+    n_chains = len(seeds)
+
+    print(f"Launching {n_chains} annealing chains.")
+    start_time = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers = min(n_chains, os.cpu_count()), initializer = share_manager, initargs = (sm,)) as pool:
+        results = list(pool.map(run_chain, seeds, [temp] * n_chains, [coolingRate] * n_chains, [time_budget] * n_chains, [options] * n_chains,
+                                [trace_fn] * n_chains, [trace_options] * n_chains))
+
+    end_time = time.perf_counter()
+    t_diff = end_time - start_time
+
+    for i, (seed, schedule, energy, annealing_time) in enumerate(results):
+        print(f"Chain {i} \t Seed: {seed} \t Score: {-energy:.2f} \t Run Time: {annealing_time:.4f}")
+
+    seed, best_schedule, best_energy, annealing_time = min(results, key = lambda x: x[2])
+
+    print(f"All chains took {t_diff:.2f} seconds.")
+    print(f"Best score was {-best_energy:.2f} points, from seed {seed}.")
+
+    return best_schedule, best_energy, t_diff
+
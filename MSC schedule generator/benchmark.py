@@ -0,0 +1,189 @@
+"""
+Scaling benchmarks, over synthetic rosters of increasing size.
+
+For each size, a synthetic input folder is generated (see syntheticdata.py)
+and timed through every stage of a run:
+
+    ingest        initialize, load_msc_schedule and import_worker_schedules, from scratch
+    ingest cached the same again, with the parsed forms cache warm
+    construct     create_default_schedule
+    flow          optimal_assignment, the exact solver's min cost flow
+    successor     successor() calls per second
+    move          reroll, evaluate and revert moves per second, as the annealer makes them
+    evaluate      full rescorings (reset_aggregates and evaluate) per second
+    batch         rerolls per second drawn by propose_batch and scored together
+                  on the numpy engine, BATCH_CANDIDATES at a time
+
+along with the peak memory traced while loading the constraints and
+constructing a schedule.
+
+Results can be saved as JSON, and compared against a saved baseline to catch
+slowdowns before a term starts:
+
+    python benchmark.py --json today.json
+    python benchmark.py --baseline today.json
+"""
+import os, time, json, random, shutil, tempfile, argparse, tracemalloc
+from schedulemanager import *
+from annealing import NUM_CHANGES
+from denseschedule import DenseProblem
+from flowsolver import optimal_assignment
+from syntheticdata import generate_workload
+
+
+
+BENCHMARK_SIZES = [10, 50, 100, 250, 500, 1000]
+BENCHMARK_SECONDS = 1 #how long each throughput figure is measured for
+REGRESSION_TOLERANCE = 1.5 #how many times slower than the baseline counts as a regression
+BATCH_CANDIDATES = 64 #rerolls per batch, for the batch figure
+
+# lower is better for these figures, higher for the rest
+TIMED_FIELDS = ["ingest_seconds", "ingest_cached_seconds", "construct_seconds", "flow_seconds", "peak_memory_mb"]
+RATE_FIELDS = ["successors_per_sec", "moves_per_sec", "evaluations_per_sec", "batch_moves_per_sec"]
+
+
+def timed(f):
+    """
+    Calls f and returns (what it returned, the seconds it took).
+    """
+    start_time = time.perf_counter()
+    result = f()
+    return result, time.perf_counter() - start_time
+
+def throughput(f, seconds = BENCHMARK_SECONDS):
+    """
+    Calls f over and over for about the given number of seconds, and returns
+    the calls per second.
+    """
+    calls = 0
+    start_time = time.perf_counter()
+    while True:
+        for i in range(10):
+            f()
+        calls += 10
+        elapsed = time.perf_counter() - start_time
+        if elapsed >= seconds:
+            return calls / elapsed
+
+def ingest(directory, use_cache):
+    sm = ScheduleManager(directory, use_cache = use_cache)
+    assert sm.initialize()
+    assert sm.load_msc_schedule()
+    assert sm.import_worker_schedules()
+    return sm
+
+def benchmark_size(n_tutors, directory, seed = 0, seconds = BENCHMARK_SECONDS):
+    """
+    Generates a roster of n_tutors into directory and benchmarks it. Returns
+    the results record.
+    """
+    generate_workload(directory, n_tutors, seed)
+    rng = random.Random(seed)
+
+    sm, ingest_time = timed(lambda: ingest(directory, False))
+    ps, construct_time = timed(lambda: sm.create_default_schedule(rng))
+    flow_ps, flow_time = timed(lambda: optimal_assignment(sm))
+
+    ingest(directory, True) #fills the cache...
+    cached_sm, cached_time = timed(lambda: ingest(directory, True)) #...for this one to read from
+
+    # memory is traced on a pass of its own, since tracing slows everything down
+    tracemalloc.start()
+    ingest(directory, True).create_default_schedule(rng)
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    def move():
+        ps.evaluate()
+        sm.reroll(ps, NUM_CHANGES, rng)
+        ps.evaluate()
+        ps.revert_move()
+
+    def rescore():
+        ps.reset_aggregates()
+        ps.evaluate()
+
+    ds = DenseProblem(sm).from_potential(ps)
+    def batch():
+        ds.score_moves(sm.propose_batch(ds, BATCH_CANDIDATES, NUM_CHANGES, rng))
+
+    return {
+        "tutors": n_tutors,
+        "shifts": sum(sum(workers_needed) for workers_needed in sm.shifts.values()),
+        "ingest_seconds": ingest_time,
+        "ingest_cached_seconds": cached_time,
+        "construct_seconds": construct_time,
+        "flow_seconds": flow_time,
+        "successors_per_sec": throughput(lambda: sm.successor(ps, NUM_CHANGES, rng).evaluate(), seconds),
+        "moves_per_sec": throughput(move, seconds),
+        "evaluations_per_sec": throughput(rescore, seconds),
+        "batch_moves_per_sec": throughput(batch, seconds) * BATCH_CANDIDATES,
+        "peak_memory_mb": peak_memory / 2**20,
+    }
+
+def run_benchmarks(sizes = BENCHMARK_SIZES, seed = 0, seconds = BENCHMARK_SECONDS, workdir = None):
+    """
+    Benchmarks every roster size in turn, printing each result as it's done.
+    The synthetic folders go in workdir if given (and are kept), otherwise in
+    a temporary folder that is deleted afterwards.
+    """
+    root = workdir if workdir is not None else tempfile.mkdtemp(prefix = "msc benchmark ")
+    records = []
+    try:
+        print(f"{'tutors':>7} {'shifts':>7} {'ingest':>8} {'cached':>8} {'build':>8} {'flow':>8} {'succ/s':>9} {'moves/s':>9} {'evals/s':>9} {'batch/s':>9} {'peak MB':>8}")
+        for n_tutors in sizes:
+            record = benchmark_size(n_tutors, os.path.join(root, f"{n_tutors} tutors"), seed, seconds)
+            records.append(record)
+            print(f"{record['tutors']:>7} {record['shifts']:>7} {record['ingest_seconds']:>8.3f} {record['ingest_cached_seconds']:>8.3f} "
+                  f"{record['construct_seconds']:>8.4f} {record['flow_seconds']:>8.3f} {record['successors_per_sec']:>9.0f} {record['moves_per_sec']:>9.0f} "
+                  f"{record['evaluations_per_sec']:>9.0f} {record['batch_moves_per_sec']:>9.0f} {record['peak_memory_mb']:>8.1f}")
+    finally:
+        if workdir is None:
+            shutil.rmtree(root, ignore_errors = True)
+    return records
+
+def compare(records, baseline, tolerance = REGRESSION_TOLERANCE):
+    """
+    Prints every figure that got more than tolerance times worse than in the
+    baseline records. Returns how many there were.
+    """
+    baseline = {record["tutors"]: record for record in baseline}
+    regressions = 0
+    for record in records:
+        old = baseline.get(record["tutors"])
+        if old is None:
+            continue
+        for field in TIMED_FIELDS + RATE_FIELDS:
+            if not old.get(field) or not record[field]:
+                continue
+            slowdown = record[field] / old[field] if field in TIMED_FIELDS else old[field] / record[field]
+            if slowdown > tolerance:
+                regressions += 1
+                print(f"REGRESSION: {field} at {record['tutors']} tutors went from {old[field]:.4g} to {record[field]:.4g}")
+    if not regressions:
+        print("No regressions against the baseline.")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Benchmarks the schedule generator on synthetic rosters of increasing size.")
+    parser.add_argument("--sizes", type = int, nargs = "+", default = BENCHMARK_SIZES, help = "roster sizes, in tutors")
+    parser.add_argument("--seed", type = int, default = 0, help = "random seed for the synthetic rosters")
+    parser.add_argument("--seconds", type = float, default = BENCHMARK_SECONDS, help = "how long to measure each throughput for")
+    parser.add_argument("--workdir", help = "generate the rosters here and keep them, instead of in a temporary folder")
+    parser.add_argument("--json", help = "save the results to this file")
+    parser.add_argument("--baseline", help = "compare against results saved earlier with --json; exits with 1 on a regression")
+    parser.add_argument("--tolerance", type = float, default = REGRESSION_TOLERANCE, help = "how many times worse than the baseline is a regression")
+    args = parser.parse_args()
+
+    records = run_benchmarks(args.sizes, args.seed, args.seconds, args.workdir)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(records, f, indent = 2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(records, baseline, args.tolerance):
+            raise SystemExit(1)
@@ -0,0 +1,332 @@
+"""
+An array-backed engine for PotentialSchedule.
+
+Instead of dicts of (name, preference) tuples, a DenseSchedule keeps the
+schedule as a boolean tensor of worker x timeslot x campus, indexed by
+integer IDs. The preference
+and availability matrices it is scored against are built once per
+ScheduleManager by DenseProblem, so every score is a handful of numpy
+reductions no matter how many tutors or timeslots there are. A batch of
+candidate moves (see ScheduleManager.propose_batch) is scored the same way,
+all at once, looking only at the slots the moves touch.
+
+numpy is only needed when this engine is used.
+"""
+from schedulemanager import PotentialSchedule
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def batch_energies(gaps, hours, priority, trips_in, min_hrs, min_proportion, mean_weighted, n_workers):
+    """
+    PotentialSchedule.evaluate(), over arrays of score terms, one per schedule.
+    """
+    score = gaps * -1000
+    score = score + min_hrs * 100
+    score = score + min_proportion ** 2 * 100
+    score = score + hours
+    score = score / np.where(trips_in > 0, trips_in / n_workers, 1)
+    score = score * ((priority / np.maximum(hours, 1)) ** 2 + 1)
+    score = score * (mean_weighted + 1)
+    return -score
+
+
+class DenseProblem:
+
+    def __init__(self, sm):
+        """
+        Lays the loaded constraints of a ScheduleManager out as arrays.
+        """
+        if np is None:
+            raise ImportError("The dense schedule engine needs numpy installed: pip install numpy")
+
+        self.worker_constraints = sm.worker_constraints
+        self.campuses = sm.campuses
+        self.worker_capacity = sm.worker_capacity
+        self.shifts = sm.shifts
+        self.slot_hours = sm.slot_hours
+
+        self.workers = list(sm.worker_capacity.keys())
+        self.timeslots = list(sm.shifts.keys())
+        self.worker_index = {worker: i for i, worker in enumerate(self.workers)}
+        self.slot_index = {timeslot: i for i, timeslot in enumerate(self.timeslots)}
+
+        n_workers = len(self.workers)
+        n_slots = len(self.timeslots)
+
+        # -1 where the worker can't work, otherwise their priority
+        self.preferences = np.full((n_workers, n_slots, len(sm.campuses)), -1, dtype = np.int8)
+        for timeslot, constraints in sm.worker_constraints.items():
+            t = self.slot_index[timeslot]
+            for worker, preference in constraints.items():
+                self.preferences[self.worker_index[worker], t] = preference
+
+        self.available = self.preferences != -1
+        self.priority_points = np.select([self.preferences == 1, self.preferences == 2], [2, 1], 0).astype(np.int8)
+
+        self.demand = np.array([sm.shifts[timeslot] for timeslot in self.timeslots], dtype = np.int32)
+        self.total_demand = int(self.demand.sum())
+
+        capacity = np.array([sm.worker_capacity[worker] for worker in self.workers], dtype = np.int32).reshape(-1, 3)
+        self.desired = capacity[:,0]
+        self.allotted = capacity[:,1]
+        self.weighted = capacity[:,2] / capacity[:,0] > 2 #if you don't have many open hours, your desires aren't counted
+
+        # the slots an hour earlier and later on the same day, for counting trips in
+        self.previous_slot = np.zeros(n_slots, dtype = np.intp)
+        self.has_previous = np.zeros(n_slots, dtype = bool)
+        self.next_slot = np.zeros(n_slots, dtype = np.intp)
+        self.has_next = np.zeros(n_slots, dtype = bool)
+        for timeslot, t in self.slot_index.items():
+            previous = (timeslot[0]-1, timeslot[1])
+            if previous in self.slot_index:
+                self.previous_slot[t] = self.slot_index[previous]
+                self.has_previous[t] = True
+                self.next_slot[self.slot_index[previous]] = t
+                self.has_next[self.slot_index[previous]] = True
+
+        # A worker staying on from the hour before is only the same entry in
+        # the dict schedule if their preferences match across both hours.
+        self.stays_on = self.has_previous[None,:] & (self.preferences == self.preferences[:, self.previous_slot]).all(axis = 2)
+
+    def weighted_mean(self, proportion):
+        """
+        The mean proportion of desired hours over the weighted workers, along
+        the last axis; 0 when nobody is weighted, like mean_desired_weighted.
+        """
+        if not self.weighted.any():
+            return np.zeros(proportion.shape[:-1])
+        return proportion[..., self.weighted].mean(axis = -1)
+
+    def new_schedule(self):
+        return DenseSchedule(self)
+
+    def from_potential(self, ps):
+        """
+        Converts a dict-backed PotentialSchedule into a DenseSchedule.
+        """
+        ds = DenseSchedule(self)
+        for campus in range(len(self.campuses)):
+            for timeslot, workers in ps.schedule[campus].items():
+                ds.add_workers_to_slot(timeslot, campus, workers)
+        return ds
+
+
+class DenseSchedule(PotentialSchedule):
+    """
+    A drop-in replacement for PotentialSchedule backed by a DenseProblem.
+    Works with ScheduleManager.successor, evaluate() and the reports.
+    """
+
+    def __init__(self, problem, assigned = None, hours = None):
+        self.problem = problem
+        self.worker_capacity = problem.worker_capacity
+        self.shifts = problem.shifts
+        self.slot_hours = problem.slot_hours
+
+        if assigned is None:
+            self.assigned = np.zeros(problem.available.shape, dtype = bool)
+            self.hours = np.zeros(len(problem.workers), dtype = np.int32)
+        else:
+            self.assigned = assigned
+            self.hours = hours
+
+        self.energy = None
+        self.stats = None
+        self.undo_log = None
+
+    def copy(self):
+        return DenseSchedule(self.problem, self.assigned.copy(), self.hours.copy())
+
+    def to_potential(self):
+        """
+        Converts back to a dict-backed PotentialSchedule, eg. for the writers.
+        """
+        ps = PotentialSchedule(self.worker_capacity, self.shifts, slot_hours = self.slot_hours)
+        for campus, slots in enumerate(self.schedule):
+            for timeslot, workers in slots.items():
+                ps.add_workers_to_slot(timeslot, campus, workers)
+        return ps
+
+    @property
+    def schedule(self):
+        """
+        The schedule in PotentialSchedule's layout: campus : (hour,day) : [(person, preference)]
+        """
+        problem = self.problem
+        schedule = [dict() for campus in problem.campuses]
+        for campus in range(len(problem.campuses)):
+            for timeslot in problem.timeslots:
+                schedule[campus][timeslot] = self.slot_workers(timeslot, campus)
+        return schedule
+
+    @property
+    def worker_slotted_hrs(self):
+        return dict(zip(self.problem.workers, self.hours.tolist()))
+
+    def desires_more_hours(self, worker):
+        w = self.problem.worker_index[worker[0]]
+        return self.hours[w] < self.problem.desired[w]
+
+    def slotted_hours(self, worker_name):
+        return int(self.hours[self.problem.worker_index[worker_name]])
+
+    def allotted_more_hours(self, worker):
+        w = self.problem.worker_index[worker[0]]
+        return self.hours[w] < self.problem.allotted[w]
+
+    def start_move(self):
+        self.undo_log = dict() #(campus, timeslot) : workers before the move
+        self.undo_totals = (self.energy, self.stats)
+
+    def revert_move(self):
+        log = self.undo_log
+        self.undo_log = None
+        for (campus, timeslot), workers in log.items():
+            self.clear_slot(timeslot, campus)
+            self.add_workers_to_slot(timeslot, campus, workers)
+        self.energy, self.stats = self.undo_totals
+
+    def score_moves(self, moves):
+        """
+        The energy each move from ScheduleManager.propose_batch would leave
+        this schedule with, made on its own, scored together in one
+        vectorized pass. Only the slots the moves touch, and the slots the
+        hour after them, are looked at. The moves must all touch the same
+        number of slots, as propose_batch's do.
+        """
+        problem = self.problem
+        stats = self.score_components()
+        workers = problem.worker_index
+        n_moves = len(moves)
+        n_changed = len(moves[0])
+
+        # the slots each move changes, and what they'd hold after it
+        t = np.array([[problem.slot_index[timeslot] for timeslot, campus in move] for move in moves], dtype = np.intp).reshape(n_moves, n_changed)
+        c = np.array([[campus for timeslot, campus in move] for move in moves], dtype = np.intp).reshape(n_moves, n_changed)
+        new = np.zeros((n_moves, n_changed, len(problem.workers)), dtype = bool)
+        for k, move in enumerate(moves):
+            for m, slot_workers in enumerate(move.values()):
+                new[k, m, [workers[worker[0]] for worker in slot_workers]] = True
+
+        columns = lambda t, c: np.moveaxis(self.assigned[:, t, c], 0, -1) #a worker axis last, for each slot
+        old = columns(t, c)
+        change = new.astype(np.int32) - old
+        hours = self.hours + change.sum(axis = 1)
+        filled = stats["hours"] + change.sum(axis = (1, 2))
+        priority = stats["priority"] + (change * np.moveaxis(problem.priority_points[:, t, c], 0, -1)).sum(axis = (1, 2))
+
+        # what the slot an hour before each changed slot holds after the move, which may have changed it too
+        moved = np.arange(n_moves)[:, None]
+        in_move = np.zeros((n_moves,) + self.assigned.shape[1:], dtype = bool)
+        in_move[moved, t, c] = True
+        position = np.zeros(in_move.shape, dtype = np.intp)
+        position[moved, t, c] = np.arange(n_changed)
+        previous = problem.previous_slot[t]
+        previous_after = np.where(in_move[moved, previous, c][..., None], new[moved, position[moved, previous, c]], columns(previous, c))
+
+        stays_on = np.moveaxis(problem.stays_on[:, t], 0, -1)
+        trips = lambda slot, before: (slot & ~(before & stays_on)).sum(axis = -1)
+        trips_in = trips(new, previous_after) - trips(old, columns(previous, c))
+
+        # the slots the hour after, which now follow a changed slot, unless they changed too
+        following = problem.next_slot[t]
+        following_stays_on = np.moveaxis(problem.stays_on[:, following], 0, -1)
+        after = columns(following, c)
+        counted = problem.has_next[t] & ~in_move[moved, following, c]
+        trips_in += counted * ((after & ~(new & following_stays_on)).sum(axis = -1) - (after & ~(old & following_stays_on)).sum(axis = -1))
+        trips_in = stats["trips_in"] + trips_in.sum(axis = 1)
+
+        proportion = hours / problem.desired
+        return batch_energies(problem.total_demand - filled, filled, priority, trips_in, hours.min(axis = 1),
+                              proportion.min(axis = 1), problem.weighted_mean(proportion), len(problem.workers)).tolist()
+
+    def works(self, worker_name, timeslot, campus):
+        t = self.problem.slot_index.get(timeslot)
+        return t is not None and bool(self.assigned[self.problem.worker_index[worker_name], t, campus])
+
+    def is_working(self, worker_name, timeslot):
+        t = self.problem.slot_index.get(timeslot)
+        return t is not None and bool(self.assigned[self.problem.worker_index[worker_name], t].any())
+
+    def slot_workers(self, timeslot, campus):
+        t = self.problem.slot_index[timeslot]
+        constraints = self.problem.worker_constraints[timeslot]
+        return [(self.problem.workers[w], constraints[self.problem.workers[w]]) for w in np.flatnonzero(self.assigned[:, t, campus])]
+
+    def add_workers_to_slot(self, timeslot, campus, workers):
+        self.log_slot(timeslot, campus)
+        t = self.problem.slot_index[timeslot]
+        for worker in workers:
+            w = self.problem.worker_index[worker[0]]
+            self.assigned[w, t, campus] = True
+            self.hours[w] += 1
+        self.energy = None
+        self.stats = None
+
+    def clear_slot(self, timeslot, campus):
+        self.log_slot(timeslot, campus)
+        removed = self.slot_workers(timeslot, campus)
+        slot = self.assigned[:, self.problem.slot_index[timeslot], campus]
+        self.hours -= slot
+        slot[:] = False
+        self.energy = None
+        self.stats = None
+        return removed
+
+    def score_components(self):
+        """
+        Computes every term of the score in one vectorized pass over the
+        schedule tensor. Cached until the schedule next changes.
+        """
+        if self.stats is not None:
+            return self.stats
+
+        problem = self.problem
+        assigned = self.assigned
+
+        filled = int(assigned.sum())
+        proportion = self.hours / problem.desired
+
+        continuing = assigned[:, problem.previous_slot] & problem.stays_on[:,:,None]
+
+        self.stats = {
+            "gaps": problem.total_demand - filled,
+            "hours": filled,
+            "priority": int(problem.priority_points[assigned].sum()),
+            "trips_in": int((assigned & ~continuing).sum()),
+            "min_hrs": int(self.hours.min()),
+            "min_proportion": float(proportion.min()),
+            "mean_weighted": float(problem.weighted_mean(proportion)),
+        }
+        return self.stats
+
+    def count_gaps(self):
+        return self.score_components()["gaps"]
+
+    def total_hours(self):
+        return self.score_components()["hours"]
+
+    def count_under_desired(self):
+        return int((self.hours < self.problem.desired).sum())
+
+    def avg_priority(self):
+        stats = self.score_components()
+        if not stats["hours"]:
+            return 0
+        return stats["priority"] / stats["hours"]
+
+    def min_hrs_filled(self):
+        return self.score_components()["min_hrs"]
+
+    def min_hrs_proportion(self):
+        return self.score_components()["min_proportion"]
+
+    def mean_desired_weighted(self):
+        return self.score_components()["mean_weighted"]
+
+    def avg_trips_in(self):
+        return self.score_components()["trips_in"] / len(self.problem.workers)
@@ -0,0 +1,200 @@
+"""
+Exports a schedule for other systems to read: payroll, room booking, or
+anything else that would rather not open a workbook.
+
+An Exporter writes the schedule, the constraints and the per worker report
+together, as one of:
+
+    xlsx      the usual schedule and constraints workbooks, and report.txt
+    json      one file holding all of it
+    csv       one file per table: assignments, gaps, workers and constraints
+    parquet   the same tables as csv; needs pyarrow installed
+
+Every assignment, constraint and gap is listed with its campus, day and
+time as the hours of operation workbook labels them. The labels and the
+constraints are worked out once per Exporter, so writing many schedules,
+eg. every chain of a multistart, only pays for the schedules themselves.
+The same goes for xlsx: the templates are opened once, and each sheet's
+cells are built in memory and written in one pass.
+"""
+import csv, json
+import openpyxl as op
+from schedulemanager import *
+
+
+
+EXPORT_FORMATS = ["xlsx", "json", "csv", "parquet"]
+EXPORT_BASENAME = 'MSC Tutor Schedule' #what the json, csv and parquet files are named after, by default
+
+ASSIGNMENT_FIELDS = ["campus", "day", "time", "row", "column", "worker", "priority"]
+WORKER_FIELDS = ["worker", "desired", "allotted", "open", "scheduled", "proportion"]
+CONSTRAINT_FIELDS = ["campus", "day", "time", "row", "column", "worker", "priority"]
+GAP_FIELDS = ["campus", "day", "time", "row", "column", "needed", "scheduled"]
+
+
+def timeslot_labels(sm):
+    """
+    The day and time the hours of operation workbook labels each timeslot
+    with: (hour,day) : (day, time).
+    """
+    wb = op.open(sm.path(MSC_WORKERS_NEEDED_FILENAME))
+    ws = wb.active
+    first_row, last_row, first_column, last_column = sm.grid or find_time_grid(ws)
+    labels = {(hour, day): (str(ws.cell(first_row - 1, day).value), str(ws.cell(hour, first_column - 1).value))
+              for hour in range(first_row, last_row + 1) for day in range(first_column, last_column + 1)}
+    wb.close()
+    return labels
+
+def schedule_summary(ps):
+    """
+    The figures report.txt opens with, as a dict.
+    """
+    return {
+        "avg_priority": ps.avg_priority(),
+        "total_hours": ps.total_hours() * ps.slot_hours,
+        "min_hrs_filled": ps.min_hrs_filled() * ps.slot_hours,
+        "min_hrs_proportion": ps.min_hrs_proportion(),
+        "mean_desired_weighted": ps.mean_desired_weighted(),
+        "mean_trips_in": ps.avg_trips_in(),
+        "geom_mean_desired": ps.geometric_mean_desired(),
+        "gaps": ps.count_gaps(),
+        "score": -ps.evaluate(),
+    }
+
+def write_csv(fn, records, fields):
+    with open(fn, "w", newline = "") as f:
+        writer = csv.DictWriter(f, fields)
+        writer.writeheader()
+        writer.writerows(records)
+
+def write_parquet(fn, records, fields):
+    """
+    Writes records as a Parquet table. pyarrow is only imported here, since
+    it's only needed for Parquet.
+    """
+    try:
+        import pyarrow as pa, pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Exporting Parquet needs pyarrow: pip install pyarrow")
+    table = pa.Table.from_pydict({field: [record[field] for record in records] for field in fields})
+    pq.write_table(table, fn)
+
+
+class Exporter:
+
+    def __init__(self, sm):
+        self.sm = sm
+        self.labels = timeslot_labels(sm)
+        self.constraints = self.constraint_records()
+        self.templates = dict() #template filename : the workbook, opened once and saved again for every write
+
+    def template(self, fn):
+        """
+        A template workbook, opened the first time it's asked for. The
+        constraints template is filled in then, since the constraints don't
+        change.
+        """
+        if fn not in self.templates:
+            wb = op.open(self.sm.path(fn))
+            if fn == MSC_CONSTRAINTS_FILENAME:
+                self.sm.fill_sheets(wb, self.sm.constraint_cells())
+            self.templates[fn] = wb
+        return self.templates[fn]
+
+    def place(self, timeslot, campus):
+        """
+        Where a slot is, for a record: its campus, day and time, and its cell.
+        """
+        day, time = self.labels.get(timeslot, (None, None))
+        return {"campus": self.sm.campuses[campus], "day": day, "time": time, "row": timeslot[0], "column": timeslot[1]}
+
+    def assignment_records(self, ps):
+        """
+        One record per worker per slot they're scheduled for, and one per
+        slot still short of workers: the gaps.
+        """
+        assignments = []
+        gaps = []
+        for campus in range(len(self.sm.campuses)):
+            for timeslot in self.sm.staffed_shifts[campus]:
+                workers = ps.slot_workers(timeslot, campus)
+                place = self.place(timeslot, campus)
+                for worker in workers:
+                    assignments.append(dict(place, worker = worker[0], priority = worker[1][campus]))
+                needed = self.sm.shifts[timeslot][campus]
+                if len(workers) < needed:
+                    gaps.append(dict(place, needed = needed, scheduled = len(workers)))
+        return assignments, gaps
+
+    def worker_records(self, ps):
+        """
+        report.txt's per worker part, most scheduled for their desired hours first.
+        """
+        records = []
+        for worker, (desired, allotted, open_slots) in self.sm.worker_capacity.items():
+            scheduled = ps.slotted_hours(worker)
+            hours = self.sm.slot_hours
+            records.append({"worker": worker, "desired": desired * hours, "allotted": allotted * hours, "open": open_slots * hours,
+                            "scheduled": scheduled * hours, "proportion": scheduled / desired})
+        records.sort(key = lambda record: record["proportion"], reverse = True)
+        return records
+
+    def constraint_records(self):
+        """
+        Who can work each staffed slot, and at what priority.
+        """
+        records = []
+        for campus in range(len(self.sm.campuses)):
+            for timeslot in self.sm.staffed_shifts[campus]:
+                place = self.place(timeslot, campus)
+                for worker in self.sm.eligible_workers[(timeslot, campus)]:
+                    records.append(dict(place, worker = worker[0], priority = worker[1][campus]))
+        return records
+
+    def write(self, ps, fmt = "xlsx", base = None, schedule_fn = None, constraints_fn = None, report_fn = None):
+        """
+        Writes ps, the constraints and the report in format fmt. Returns the
+        files written.
+
+        xlsx goes where write_schedule_to_spreadsheet and
+        write_constraints_to_spreadsheet put it unless schedule_fn and
+        constraints_fn say otherwise, with the report in report_fn, or
+        REPORT_FILENAME in the folder. The
+        other formats are named after base, EXPORT_BASENAME in the folder by
+        default.
+        """
+        sm = self.sm
+        if fmt == "xlsx":
+            schedule_fn = schedule_fn or sm.path(MSC_TUTOR_SCHEDULE_FILENAME)
+            constraints_fn = constraints_fn or sm.path(MSC_CONSTRAINTS_FILENAME)
+            report_fn = report_fn or sm.path(REPORT_FILENAME)
+            wb = self.template(MSC_TUTOR_SCHEDULE_FILENAME)
+            sm.fill_sheets(wb, sm.schedule_cells(ps))
+            wb.save(schedule_fn)
+            self.template(MSC_CONSTRAINTS_FILENAME).save(constraints_fn)
+            ps.write_report(report_fn)
+            return [schedule_fn, constraints_fn, report_fn]
+
+        if base is None:
+            base = sm.path(EXPORT_BASENAME)
+        assignments, gaps = self.assignment_records(ps)
+        workers = self.worker_records(ps)
+
+        if fmt == "json":
+            fn = base + ".json"
+            with open(fn, "w") as f:
+                json.dump({"campuses": list(sm.campuses), "summary": schedule_summary(ps), "assignments": assignments,
+                           "gaps": gaps, "workers": workers, "constraints": self.constraints}, f, indent = 1)
+            return [fn]
+
+        if fmt not in ("csv", "parquet"):
+            raise ValueError(f"Can't export as {fmt}: pick one of {', '.join(EXPORT_FORMATS)}.")
+        writer = write_csv if fmt == "csv" else write_parquet
+        tables = [("assignments", assignments, ASSIGNMENT_FIELDS), ("gaps", gaps, GAP_FIELDS), ("workers", workers, WORKER_FIELDS),
+                  ("constraints", self.constraints, CONSTRAINT_FIELDS)]
+        files = []
+        for name, records, fields in tables:
+            fn = f"{base} {name}.{fmt}"
+            writer(fn, records, fields)
+            files.append(fn)
+        return files
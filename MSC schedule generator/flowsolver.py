@@ -0,0 +1,302 @@
+"""
+An exact solver for the assignment at the heart of the schedule, as a min
+cost flow.
+
+Flow runs from a source to every worker, from each worker to the timeslots
+they can work, from there to the campuses they can work it at, and from
+every (timeslot, campus) slot to a sink:
+
+    source -> worker -> worker at timeslot -> slot -> sink
+
+Capacities enforce what the annealer has to find by trial and error: a worker
+gets at most their allotted hours, works at most one campus an hour, and a
+slot takes at most the workers it needs. A maximum flow then fills as many
+shifts as can possibly be filled, so the gaps it leaves are provably the
+fewest. Among those flows, the cheapest one favours first priorities and
+spreads hours so everyone gets close to what they asked for.
+
+What the flow can't see, like trips in, is left to an annealing polish that
+starts from the flow's schedule.
+
+With scipy installed, the flow is solved as a linear program by HiGHS,
+which takes well under a second for a thousand tutors. Without it, a pure
+Python primal-dual solver finds the same optimum, several times slower.
+"""
+import heapq, time
+from schedulemanager import PotentialSchedule
+from annealing import Annealer
+
+try:
+    import numpy as np
+    from scipy.optimize import linprog
+    from scipy.sparse import coo_matrix
+except ImportError:
+    linprog = None
+
+
+
+PRIORITY_COST = {1: 0, 2: 25, 0: 50} #first, second, and third priorities
+HOUR_COST = 100            #the k-th hour of a worker who desires d hours costs HOUR_COST * k / d, so hours spread out evenly
+OVER_DESIRED_COST = 200    #on top of that, for every hour past what the worker desires
+
+POLISH_TEMP = 100          #starting temperature of the annealing polish; low, since the flow's schedule is already good
+
+
+class MinCostFlow:
+    """
+    Min cost flow, as a linear program when scipy is installed, otherwise by
+    the primal-dual method. Each primal-dual round, Dijkstra on costs
+    reduced by node potentials finds how far the sink is by the cheapest
+    path, then a blocking flow, as in Dinic's algorithm, is pushed along
+    every path that cheap at once. A round fills many shifts, where pushing
+    one cheapest path at a time would take a Dijkstra per shift. Edge costs
+    must be integers, and start out nonnegative.
+    """
+
+    def __init__(self):
+        self.graph = []   #node : [edge]
+        self.to = []      #edge : node it points to
+        self.cap = []     #edge : residual capacity
+        self.cost = []    #edge : cost per unit of flow
+        # edge e ^ 1 is the reverse of edge e
+
+    def add_node(self):
+        self.graph.append([])
+        return len(self.graph) - 1
+
+    def add_edge(self, u, v, cap, cost):
+        """
+        Adds an edge from u to v, and returns it so its flow can be read later.
+        """
+        e = len(self.to)
+        self.to += [v, u]
+        self.cap += [cap, 0]
+        self.cost += [cost, -cost]
+        self.graph[u].append(e)
+        self.graph[v].append(e + 1)
+        return e
+
+    def flow(self, e):
+        return self.cap[e ^ 1]
+
+    def solve(self, source, sink):
+        """
+        Pushes as much flow as fits from source to sink, as cheaply as
+        possible. Returns (flow, cost).
+        """
+        if linprog is not None:
+            return self.solve_linear_program(source, sink)
+        return self.solve_primal_dual(source, sink)
+
+    def solve_linear_program(self, source, sink):
+        """
+        solve(), as a linear program for scipy's HiGHS dual simplex. An edge
+        straight from source to sink, dearer than any path through the
+        graph, carries whatever can't get through, so the cheapest flow that
+        fills the sink's edges is also a maximum flow. A network's simplex
+        solutions are whole numbers, so the flow is exact.
+        """
+        n_edges = len(self.to) // 2
+        head = np.array(self.to[0::2] + [sink])
+        tail = np.array(self.to[1::2] + [source])
+        cost = np.array(self.cost[0::2], dtype = float)
+        cap = np.array(self.cap[0::2], dtype = float)
+
+        demand = cap[head[:-1] == sink].sum()
+        cost = np.append(cost, cost[cost > 0].sum() + 1)
+        cap = np.append(cap, demand)
+
+        # flow into every node equals flow out, except demand leaves the source for the sink
+        edges = np.arange(n_edges + 1)
+        balance = coo_matrix((np.concatenate([np.ones(n_edges + 1), -np.ones(n_edges + 1)]),
+                              (np.concatenate([head, tail]), np.concatenate([edges, edges]))), shape = (len(self.graph), n_edges + 1))
+        supply = np.zeros(len(self.graph))
+        supply[source] = -demand
+        supply[sink] = demand
+
+        result = linprog(cost, A_eq = balance.tocsr(), b_eq = supply, bounds = np.stack([np.zeros(n_edges + 1), cap], axis = 1), method = "highs-ds")
+        if result.status != 0:
+            raise ValueError(f"The flow's linear program couldn't be solved: {result.message}")
+
+        flow = np.rint(result.x).astype(int)
+        for e in np.flatnonzero(flow[:-1]).tolist():
+            self.cap[2 * e] -= int(flow[e])
+            self.cap[2 * e + 1] += int(flow[e])
+        return int(demand) - int(flow[-1]), int(flow[:-1] @ cost[:-1].astype(int))
+
+    def solve_primal_dual(self, source, sink):
+        """
+        solve(), in pure Python.
+        """
+        graph, to, cap, cost = self.graph, self.to, self.cap, self.cost
+        n = len(graph)
+        inf = float("inf")
+        potential = [0] * n
+
+        total_flow = 0
+        total_cost = 0
+
+        while True:
+            # shortest paths from the source by reduced cost, as far as the sink
+            dist = [inf] * n
+            dist[source] = 0
+            heap = [(0, source)]
+            while heap:
+                d, u = heapq.heappop(heap)
+                if d > dist[u]:
+                    continue
+                if u == sink:
+                    break
+                pu = potential[u]
+                for e in graph[u]:
+                    if cap[e]:
+                        v = to[e]
+                        nd = d + cost[e] + pu - potential[v]
+                        if nd < dist[v]:
+                            dist[v] = nd
+                            heapq.heappush(heap, (nd, v))
+
+            if dist[sink] == inf:
+                return total_flow, total_cost
+
+            # nodes past the sink move as far as it does, which keeps every reduced cost nonnegative
+            reach = dist[sink]
+            for v in range(n):
+                potential[v] += min(dist[v], reach)
+
+            # the cheapest paths are now the ones made of edges with no reduced cost
+            admissible = lambda e, u: cap[e] and cost[e] + potential[u] == potential[to[e]]
+
+            while True:
+                level = [-1] * n
+                level[source] = 0
+                queue = [source]
+                for u in queue:
+                    for e in graph[u]:
+                        v = to[e]
+                        if level[v] < 0 and admissible(e, u):
+                            level[v] = level[u] + 1
+                            queue.append(v)
+                if level[sink] < 0:
+                    break
+
+                # blocking flow, walking paths without recursion; next[u] is the next edge out of u to try
+                next = [0] * n
+                path = []
+                u = source
+                while True:
+                    if u == sink:
+                        push = min(cap[e] for e in path)
+                        for e in path:
+                            cap[e] -= push
+                            cap[e ^ 1] += push
+                            total_cost += push * cost[e]
+                        total_flow += push
+                        path = []
+                        u = source
+                        continue
+
+                    edges = graph[u]
+                    while next[u] < len(edges):
+                        e = edges[next[u]]
+                        v = to[e]
+                        if level[v] == level[u] + 1 and admissible(e, u):
+                            break
+                        next[u] += 1
+                    else:
+                        if u == source:
+                            break
+                        level[u] = -1 #a dead end: don't come back
+                        e = path.pop()
+                        u = to[e ^ 1]
+                        next[u] += 1
+                        continue
+                    path.append(e)
+                    u = v
+
+
+def optimal_assignment(sm):
+    """
+    Builds the schedule from the min cost flow over the loaded constraints of
+    a ScheduleManager. It has the fewest gaps possible, without anybody
+    working past their allotted hours or at two campuses at once.
+    """
+    mcf = MinCostFlow()
+    source = mcf.add_node()
+    sink = mcf.add_node()
+
+    slots = dict() #(timeslot, campus) : node
+    for timeslot, workers_needed in sm.shifts.items():
+        for campus in range(len(sm.campuses)):
+            if workers_needed[campus]:
+                slots[(timeslot, campus)] = mcf.add_node()
+                mcf.add_edge(slots[(timeslot, campus)], sink, workers_needed[campus], 0)
+
+    assignments = [] #(edge, timeslot, campus, worker)
+    for worker_name, capacity in sm.worker_capacity.items():
+        desired, allotted = capacity[0], capacity[1]
+
+        worker = mcf.add_node()
+        for k in range(1, allotted + 1): #one edge per hour, each dearer than the last
+            hour_cost = HOUR_COST * k // desired
+            if k > desired:
+                hour_cost += OVER_DESIRED_COST
+            mcf.add_edge(source, worker, 1, hour_cost)
+
+        for timeslot, constraints in sm.worker_constraints.items():
+            preference = constraints.get(worker_name)
+            if preference is None:
+                continue
+
+            at_timeslot = None
+            for campus in range(len(sm.campuses)):
+                if preference[campus] == -1 or (timeslot, campus) not in slots:
+                    continue
+                if at_timeslot is None:
+                    at_timeslot = mcf.add_node()
+                    mcf.add_edge(worker, at_timeslot, 1, 0)
+                e = mcf.add_edge(at_timeslot, slots[(timeslot, campus)], 1, PRIORITY_COST.get(preference[campus], PRIORITY_COST[0]))
+                assignments.append((e, timeslot, campus, (worker_name, preference)))
+
+    mcf.solve(source, sink)
+
+    scheduled = dict() #(timeslot, campus) : [(name, pref)]
+    for e, timeslot, campus, worker in assignments:
+        if mcf.flow(e):
+            scheduled.setdefault((timeslot, campus), []).append(worker)
+
+    ps = PotentialSchedule(sm.worker_capacity, sm.shifts, slot_hours = sm.slot_hours)
+    for campus in range(len(sm.campuses)):
+        for timeslot in sm.shifts.keys():
+            ps.add_workers_to_slot(timeslot, campus, scheduled.get((timeslot, campus), []))
+    return ps
+
+def solve(sm, temp = POLISH_TEMP, coolingRate = 0.005, polish = True, verbose = True, time_budget = None, **options):
+    """
+    Solves the assignment exactly, then anneals from there, starting at a
+    low temperature, to improve what the flow can't see. The polish only
+    ever keeps a better schedule.
+
+    Returns the same as main(): best schedule, best energy, and time taken.
+    """
+    start_time = time.perf_counter()
+
+    ps = optimal_assignment(sm)
+
+    if verbose:
+        print(f"Min cost flow filled all but {ps.count_gaps()} shifts in {time.perf_counter() - start_time:.4f} seconds, "
+              f"scoring {-ps.evaluate():.2f} points.")
+
+    best_schedule, best_energy = ps, ps.evaluate()
+    if polish:
+        annealer = Annealer(sm, temp, coolingRate, ps = ps, time_budget = time_budget, **options)
+        best_schedule, best_energy, polish_time = annealer.run()
+
+    t_diff = time.perf_counter() - start_time
+
+    if verbose:
+        print(f"Took {t_diff} seconds.")
+        print(f"Best score was {-best_energy:.2f} points.")
+
+    return best_schedule, best_energy, t_diff
+
@@ -0,0 +1,89 @@
+"""
+A sidecar cache of parsed spreadsheets, so a rerun only rereads the
+workbooks that changed since the last run.
+
+Entries are keyed by the file's path, and remember the file's size,
+modification time and SHA-256 hash alongside what it parsed to. A file whose
+size and modification time still match is trusted as is. One whose size
+matches but modification time doesn't (eg. it was copied, or saved without
+changes) is hashed, and kept if the content is the same.
+"""
+import os, pickle, hashlib
+
+
+
+CACHE_FILENAME = 'parsed forms cache.pickle'
+CACHE_VERSION = 3 #bump whenever what gets cached changes shape, to throw out old caches
+
+
+def file_digest(fn):
+    sha = hashlib.sha256()
+    with open(fn, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+class FormCache:
+
+    def __init__(self, fn):
+        self.fn = fn
+        self.entries = dict() #key : (size, mtime, sha256, parsed)
+        self.changed = False
+
+        try:
+            with open(fn, "rb") as f:
+                version, entries = pickle.load(f)
+            if version == CACHE_VERSION:
+                self.entries = entries
+        except (OSError, EOFError, ValueError, TypeError, pickle.UnpicklingError):
+            pass #no cache yet, or one we can't use: start over
+
+    def lookup(self, key, fn):
+        """
+        Returns what the file fn parsed to last time, or None if it's new or
+        has changed since.
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+
+        size, mtime, digest, parsed = entry
+        stat = os.stat(fn)
+        if stat.st_size != size:
+            return None
+        if stat.st_mtime_ns == mtime:
+            return parsed
+
+        if file_digest(fn) != digest:
+            return None
+        self.entries[key] = (size, stat.st_mtime_ns, digest, parsed)
+        self.changed = True
+        return parsed
+
+    def store(self, key, fn, parsed):
+        stat = os.stat(fn)
+        self.entries[key] = (stat.st_size, stat.st_mtime_ns, file_digest(fn), parsed)
+        self.changed = True
+
+    def prune(self, folder, keys):
+        """
+        Forgets the entries for files in folder that aren't among keys, ie.
+        files that have since been deleted or renamed.
+        """
+        for key in list(self.entries):
+            if os.path.dirname(key) == folder and key not in keys:
+                del self.entries[key]
+                self.changed = True
+
+    def save(self):
+        """
+        Writes the cache back out if anything changed. It's written to a
+        temporary file first, so an interrupted save can't corrupt it.
+        """
+        if not self.changed:
+            return
+        temp_fn = self.fn + ".tmp"
+        with open(temp_fn, "wb") as f:
+            pickle.dump((CACHE_VERSION, self.entries), f, protocol = pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_fn, self.fn)
+        self.changed = False
@@ -0,0 +1,214 @@
+"""
+A set of small, targeted moves for local search, as an alternative to only
+rerolling whole shifts.
+
+    reroll     empty some random staffed shifts per campus and refill them at random
+    swap       two workers trade places between slots
+    shift      a worker's lone hour moves next to another of their shifts that day, to save a trip in
+    gap_fill   a slot short of workers takes the best free worker from its priority buckets
+    hand_off   an hour goes from a worker who has plenty to one short of what they want
+
+Which move is tried is picked at random, weighted towards what is wrong with
+the schedule right now: the more gaps, the likelier a gap fill, and the more
+workers short of their desired hours, the likelier a hand off. A move that
+finds nothing to do falls back to another pick, and in the end to a reroll.
+
+Every move is made in place as one move on the schedule (see
+PotentialSchedule.start_move), so it can be kept with commit_move() or
+undone with revert_move(). Works with either schedule engine.
+"""
+import random as r
+from schedulemanager import PRIORITY_LEVELS
+
+
+
+MOVE_WEIGHTS = {"reroll": 1, "swap": 3, "shift": 3, "gap_fill": 0, "hand_off": 1}
+GAP_BIAS = 2        #added to gap_fill's weight for every gap in the schedule
+UNDER_BIAS = 0.5    #added to hand_off's weight for every worker short of their desired hours
+MAX_ATTEMPTS = 8    #picks to try before falling back to a reroll
+GAP_SEARCH = 20     #random slots to look at when looking for a gap
+
+
+class MoveSet:
+
+    def __init__(self, weights = MOVE_WEIGHTS):
+        self.weights = dict(weights)
+
+    def move_weights(self, ps):
+        """
+        The weight of every move for ps, biased towards its current violations.
+        """
+        weights = dict(self.weights)
+        weights["gap_fill"] += GAP_BIAS * ps.count_gaps()
+        weights["hand_off"] += UNDER_BIAS * ps.count_under_desired()
+        return weights
+
+    def propose(self, sm, ps, n_changes, rng = r):
+        """
+        Makes one move on ps, in place, and returns its name. Follow up with
+        ps.commit_move() to keep it or ps.revert_move() to undo it. Every
+        random choice is drawn from rng.
+        """
+        weights = self.move_weights(ps)
+        names = list(weights.keys())
+        ps.start_move()
+        for attempt in range(MAX_ATTEMPTS):
+            move = rng.choices(names, list(weights.values()))[0]
+            if move == "reroll":
+                break
+            if getattr(self, move)(sm, ps, rng):
+                return move
+
+        sm.reroll(ps, n_changes, rng)
+        return "reroll"
+
+    def swap(self, sm, ps, rng = r):
+        """
+        Two workers at different hours trade places.
+        """
+        first = random_slot(sm, rng)
+        second = random_slot(sm, rng)
+        if first is None or second is None or first[0] == second[0]:
+            return False
+
+        first_workers = ps.slot_workers(*first)
+        second_workers = ps.slot_workers(*second)
+        if not first_workers or not second_workers:
+            return False
+        a = rng.choice(first_workers)
+        b = rng.choice(second_workers)
+
+        if not (can_work(sm, a[0], *second) and can_work(sm, b[0], *first)):
+            return False
+        if ps.is_working(a[0], second[0]) or ps.is_working(b[0], first[0]):
+            return False
+
+        set_slot(ps, *first, [x for x in first_workers if x != a] + [placed(sm, b[0], first[0])])
+        set_slot(ps, *second, [x for x in second_workers if x != b] + [placed(sm, a[0], second[0])])
+        return True
+
+    def shift(self, sm, ps, rng = r):
+        """
+        A worker's hour that isn't next to any other of their shifts at that
+        campus moves next to one of their other shifts that day, so their
+        hours come in one trip. If that slot is full, whoever it moves next
+        to trades places with them, if they can.
+        """
+        here = random_slot(sm, rng)
+        if here is None:
+            return False
+        here_workers = ps.slot_workers(*here)
+        if not here_workers:
+            return False
+        worker = rng.choice(here_workers)
+        name = worker[0]
+        (hour, day), campus = here
+
+        if any(ps.works(name, (hour + step, day), campus) for step in (-1, 1)):
+            return False #already part of a longer shift
+
+        targets = []
+        for other_hour in range(sm.grid[0], sm.grid[1] + 1):
+            if other_hour == hour:
+                continue
+            for other_campus in range(len(sm.campuses)):
+                if not ps.works(name, (other_hour, day), other_campus):
+                    continue
+                for step in (-1, 1):
+                    target = ((other_hour + step, day), other_campus)
+                    if target[0][0] != hour and target[0] in sm.shifts and can_work(sm, name, *target):
+                        targets.append(target)
+        if not targets:
+            return False
+
+        there = rng.choice(targets)
+        if ps.is_working(name, there[0]):
+            return False
+        there_workers = ps.slot_workers(*there)
+
+        if len(there_workers) < sm.shifts[there[0]][there[1]]:
+            set_slot(ps, *here, [x for x in here_workers if x != worker])
+            ps.add_workers_to_slot(*there, [placed(sm, name, there[0])])
+            return True
+
+        swappable = [x for x in there_workers if can_work(sm, x[0], *here) and not ps.is_working(x[0], here[0])]
+        if not swappable:
+            return False
+        other = rng.choice(swappable)
+        set_slot(ps, *here, [x for x in here_workers if x != worker] + [placed(sm, other[0], here[0])])
+        set_slot(ps, *there, [x for x in there_workers if x != other] + [placed(sm, name, there[0])])
+        return True
+
+    def gap_fill(self, sm, ps, rng = r):
+        """
+        A slot short of workers takes the best free worker from its priority
+        buckets: someone who still wants hours if possible, then by priority.
+        """
+        for i in range(GAP_SEARCH):
+            slot = random_slot(sm, rng)
+            if slot is None:
+                return False
+            if len(ps.slot_workers(*slot)) < sm.shifts[slot[0]][slot[1]]:
+                break
+        else:
+            return False
+
+        ranked = []
+        for rank, priority in enumerate(PRIORITY_LEVELS):
+            for worker in sm.candidates[slot][priority]:
+                if not ps.is_working(worker[0], slot[0]) and ps.allotted_more_hours(worker):
+                    ranked.append((not ps.desires_more_hours(worker), rank, rng.random(), worker))
+        if not ranked:
+            return False
+
+        ps.add_workers_to_slot(*slot, [min(ranked)[-1]])
+        return True
+
+    def hand_off(self, sm, ps, rng = r):
+        """
+        In a random slot, the worker furthest past their desired hours hands
+        the hour to a free worker who is short of theirs.
+        """
+        slot = random_slot(sm, rng)
+        if slot is None:
+            return False
+        slot_workers = ps.slot_workers(*slot)
+        if not slot_workers:
+            return False
+
+        proportion = lambda name: ps.slotted_hours(name) / sm.worker_capacity[name][0]
+        giver = max(slot_workers, key = lambda x: proportion(x[0]))
+
+        takers = [x for x in sm.eligible_workers[slot]
+                  if not ps.is_working(x[0], slot[0]) and ps.desires_more_hours(x) and proportion(x[0]) < proportion(giver[0])]
+        if not takers:
+            return False
+
+        taker = min(takers, key = lambda x: (proportion(x[0]), rng.random()))
+        set_slot(ps, *slot, [x for x in slot_workers if x != giver] + [taker])
+        return True
+
+
+def random_slot(sm, rng = r):
+    """
+    A random staffed (timeslot, campus), or None if nothing is staffed.
+    """
+    campuses = [campus for campus, staffed in enumerate(sm.staffed_shifts) if staffed]
+    if not campuses:
+        return None
+    campus = rng.choice(campuses)
+    return rng.choice(sm.staffed_shifts[campus]), campus
+
+def can_work(sm, name, timeslot, campus):
+    available = sm.available_bits.get(name)
+    return available is not None and (available[campus] & sm.slot_bit[timeslot]) != 0
+
+def placed(sm, name, timeslot):
+    """
+    A worker as they're listed in a slot at timeslot: (name, preferences).
+    """
+    return (name, sm.worker_constraints[timeslot][name])
+
+def set_slot(ps, timeslot, campus, workers):
+    ps.clear_slot(timeslot, campus)
+    ps.add_workers_to_slot(timeslot, campus, workers)
@@ -1,590 +1,1308 @@
-import random as r, openpyxl as op, os
-
-
-
-CONFIG_TABLE_ROW_START = 9
-CONFIG_TABLE_COLUMN_START = 2
-CONFIG_TABLE_ROW_END = 22
-CONFIG_TABLE_COLUMN_END = 8
-TUTOR_NAME_CELL = (3,3)
-TUTOR_WORK_AWARD_CELL = (3,8)
-TUTOR_DESIRED_HOURS_CELL = (5,8)
-
-MSC_WORKERS_NEEDED_FILENAME = 'MSC Hours of Operation.xlsx'
-AVAILABILITY_FOLDER_NAME = 'student availability'
-
-MSC_CONSTRAINTS_FILENAME = 'MSC Tutor Constraints.xlsx'
-MSC_TUTOR_SCHEDULE_FILENAME = 'MSC Tutor Schedule.xlsx'
-
-MAX_AWARD = 15
-
-class ScheduleManager:
-
-    def __init__(self):
-        self.loaded = False
-        self.worker_capacity = dict() #person: (preferred, allotted, open)
-        self.worker_constraints = dict()  #time,day  : dict(name, pref)
-        self.shifts = dict()              #time,day  : (CSB workers needed, SJU workers needed)
-        self.total_available_hours = 0
-
-    def initialize(self):
-        """
-        Checks if all the dependent files and folders are set up and ready. 
-        """
-
-        # if we cannot find the hours of operation file, that's a problem
-        # if we cannot find the folder with the availability, that's a problem.
-        # if we cannot find the folder to put the used availabilities, that's a problem
-
-        curdir = os.getcwd()
-
-        contents = os.listdir()
-
-        all_good = True
-
-        if not MSC_WORKERS_NEEDED_FILENAME in contents:
-            print(f"'{MSC_WORKERS_NEEDED_FILENAME}' is a dependency of this program, please place that file into the same folder as this script: {os.getcwd()}")
-            all_good = False
-        if not AVAILABILITY_FOLDER_NAME in contents:
-            print(f"'{AVAILABILITY_FOLDER_NAME}' folder is a dependency of this program. I've created that folder, place tutor availability forms into that folder.")
-            os.mkdir(AVAILABILITY_FOLDER_NAME)
-            all_good = False
-
-        if len(os.listdir(AVAILABILITY_FOLDER_NAME)) < 5:
-            file_count = os.listdir(AVAILABILITY_FOLDER_NAME)
-            print(f"Not enough files found in the folder {AVAILABILITY_FOLDER_NAME} to continue executing. \n Found: {file_count} \t Minimum: 5.")
-            all_good = False
-
-        return all_good
-        
-
-    def load_msc_schedule(self):
-        """
-        loads the hours the MSC is open and how many workers are needed at each time
-        from the configuration spreadsheet.
-        """
-        wb = op.open(r"MSC Hours of Operation.xlsx")
-        ws = wb.active
-
-        totalAvailableHours = 0
-
-        #table starts at (9,2)
-        #table ends at (22,8)
-        for hour in range(CONFIG_TABLE_ROW_START,CONFIG_TABLE_ROW_END + 1):
-            for day in range(CONFIG_TABLE_COLUMN_START, CONFIG_TABLE_COLUMN_END +1):
-                try:
-                    cell = ws.cell(hour,day)
-
-                    workers_needed = self.parse_configuration_cell(cell)  # (CSB, SJU)
-                    
-                    totalAvailableHours += sum(workers_needed)
-                    self.shifts[(hour,day)] = workers_needed
-                    self.worker_constraints.setdefault((hour,day), dict())
-                except Exception as e:
-                    raise ValueError(f"Error found in spreadsheet at cell {(hour,day)}:", e)
-
-        self.total_available_hours = totalAvailableHours
-                
-        return True
-
-    def parse_configuration_cell(self, cell):
-        v = cell.value
-        priority = 0
-        if v == None:
-            return None
-        if type(v) == int: #given no labels, default to CSB
-            return (v,0)
-        if type(v) == float:
-            return (int(v),0)#same here, but floor to an int
-        v = v.lower()
-        if "," in v:
-            parts = v.split(",")
-            if "j" in parts[0].lower():
-                sjuhours = parts[0].lower().strip("sju ")
-                csbhours = parts[1].lower().strip("csb ")
-                return (int(csbhours),int(sjuhours))
-            elif "b" in parts[0].lower():
-                sjuhours = parts[1].lower().strip("sju ")
-                csbhours = parts[0].lower().strip("csb ")
-                return (int(csbhours),int(sjuhours))
-        elif "j" in v:
-            sjuhours = v.lower().strip("sju ")
-            csbhours = 0
-            return (int(csbhours),int(sjuhours))
-        elif "b" in v:
-            sjuhours = 0
-            csbhours = v.lower().strip("csb ")
-            return (int(csbhours),int(sjuhours))
-        elif v.isdecimal():
-            sjuhours = 0
-            csbhours = v
-            return (int(csbhours),int(sjuhours))
-        else:
-            raise ValueError("Configuration spreadsheet has improper values within the table: recieved a non-integer.")
-            
-
-    def import_worker_schedules(self):
-        """
-        Reads the worker availability forms and loads them into the schedule constraints.
-        Loops through the specified directory for .xlsx files, and sends them to parse.
-        """
-
-        files = os.listdir(AVAILABILITY_FOLDER_NAME)
-        all_good = True
-        for fn in files:
-            if ".xlsx" in fn:
-                try:
-                    self.parse_availability_form(AVAILABILITY_FOLDER_NAME + "\\" + fn)
-                except ValueError as ve:
-                    all_good = False
-                    print("Something's wrong in this file: \n" + str(ve))
-                    
-            else:
-                print(f"WARNING: Non-spreadsheet file found in {AVAILABILITY_FOLDER_NAME}:  {fn}")
-                
-
-        return all_good
-
-    
-    def parse_availability_form(self, fn):
-        """
-        Parses an availability form and loads the data into the schedule constraints.
-        """
-
-        wb = op.open(fn)
-        ws = wb.active
-
-        worker_name = ws.cell(TUTOR_NAME_CELL[0],TUTOR_NAME_CELL[1]).value
-        worker_name = str(worker_name).strip()
-
-        if worker_name in ("", "None"):
-            raise ValueError("Worker name field left blank.")
-
-        award_hours = ws.cell(TUTOR_WORK_AWARD_CELL[0],TUTOR_WORK_AWARD_CELL[1]).value
-        award_hours = int(award_hours)
-
-        if (award_hours <= 0): 
-            raise ValueError(f"Improper number of work award hours: {award_hours}.")
-        if award_hours > MAX_AWARD:
-            raise ValueError(f"Improper number of work award hours: maximum exceeded: {MAX_AWARD}.")
-        
-        desired_hours = ws.cell(TUTOR_DESIRED_HOURS_CELL[0],TUTOR_DESIRED_HOURS_CELL[1]).value
-        desired_hours = int(desired_hours)
-
-        if desired_hours < 0:
-            raise ValueError(f"Improper number of desired hours: {desired_hours}.")
-        if desired_hours > award_hours:
-            raise ValueError(f"Improper number of desired hours; exceeds work award: {desired_hours}.")
-
-        total_open_hours = 0
-        error_spots = []
-        for hour in range(CONFIG_TABLE_ROW_START,CONFIG_TABLE_ROW_END + 1):
-            for day in range(CONFIG_TABLE_COLUMN_START, CONFIG_TABLE_COLUMN_END +1):
-                cell = ws.cell(hour,day)
-                
-                preference = self.parse_worker_preference(cell) #(CSB, SJU)
-
-                if type(preference) == tuple:
-                    total_open_hours += 1
-
-                    constraint_slot = self.worker_constraints[(hour,day)]
-                    
-                    constraint_slot[worker_name] = preference
-
-                    self.worker_constraints[(hour,day)] = constraint_slot
-                elif preference == "e":
-                    error_spots.append(cell.coordinate)
-                #elif preference == None do nothing
-
-
-        if len(error_spots) > 0:
-            raise ValueError("Improper entries in the following cells: \n" + "\n".join(error_spots))
-                    
-        wb.close()
-
-        self.worker_capacity[worker_name] = (desired_hours,award_hours, total_open_hours) 
-        return 
-
-    def parse_worker_preference(self, cell):
-        """
-        Scans the cell and returns the preferences of the worker
-        """
-        v = cell.value
-        if v == None:
-            return None
-        if type(v) == int: #given no labels, default to CSB
-            return (v,-1)
-        if type(v) == float:
-            return (int(v),0)#same here, but floor to an int
-    
-        v = v.lower()
-        if "x" in v:
-            return None
-        elif "-" in v:
-            return None
-        elif "csb or sju" in v:
-            v = v.strip("csb or sju")
-            return (int(v),int(v))
-        elif "j" in v:
-            sjupriority = v.strip("sju ")
-            csbpriority = -1
-            return (int(csbpriority),int(sjupriority))
-        elif "b" in v:
-            sjupriority = v.strip("csb ")
-            csbpriority = -1
-            return (int(csbpriority),int(sjupriority))
-        elif v.isdecimal():
-            sjuhours = -1
-            csbpriority = v
-            return (int(csbpriority),int(sjupriority))
-        else:
-            return "e"
-
-    def create_default_schedule(self):
-        """Takes into account the loaded schedule constraints and develops
-        a schedule that satisfies them.
-
-        Uses randomness to reduce inherent bias from hash or
-        alphabetical considerations. Non-deterministic.
-        """
-
-        ps = PotentialSchedule(self.worker_capacity, self.shifts)
-        
-        IsFirstPriority  = lambda x,y: x[1][y] == 1
-        IsSecondPriority = lambda x,y: x[1][y] == 2
-        IsThirdPriority  = lambda x,y: x[1][y] == 0
-        
-
-        priorityLevels = (IsFirstPriority, IsSecondPriority, IsThirdPriority)
-
-
-        for campus in (0,1):
-            for timeslot in self.shifts.keys():
-                
-                workingAtOtherCampus = lambda x: x in ps.schedule[(campus+1)%2].setdefault(timeslot,[])
-                
-                constraints = self.worker_constraints[timeslot]
-                workers = constraints.items() #(name, (CSB,SJU))
-                
-                workers_needed = self.shifts[timeslot][campus]
-
-                scheduled_workers = []
-                
-
-                num_yet_needed = workers_needed
-
-                # run through for people with more hours desired
-                for priority in priorityLevels:
-
-                    filter_fxn = lambda x: priority(x,campus) and ps.desires_more_hours(x) and not workingAtOtherCampus(x)
-                    
-                    workers_with_desire = list(filter(filter_fxn, workers))
-
-
-                    if len(workers_with_desire) < num_yet_needed:
-                        scheduled_workers.extend(workers_with_desire)
-                    else:
-                        scheduled_workers.extend(r.sample(workers_with_desire, k = num_yet_needed))
-                        num_yet_needed = workers_needed - len (scheduled_workers)
-                        break
-                    
-                    num_yet_needed = workers_needed - len (scheduled_workers)
-
-                
-
-
-                # if nobody WANTS to work but we still need it filled
-                if num_yet_needed > 0:
-                    # run through for people with more hours allotted
-
-                    # don't allow people to be scheduled twice!
-                    
-                    for priority in priorityLevels:
-                        filter_fxn = lambda x: priority(x, campus) and ps.allotted_more_hours(x)
-                        filter_fxn2 = lambda x: filter_fxn(x) and x not in scheduled_workers and not workingAtOtherCampus(x)
-                    
-                        workers_with_allotment = list(filter(filter_fxn2, workers))
-
-
-                        if len(workers_with_allotment) < num_yet_needed:
-                            scheduled_workers.extend(workers_with_allotment)
-                        else:
-                            scheduled_workers.extend(r.sample(workers_with_allotment, k = num_yet_needed))
-                            break
-                        
-                        num_yet_needed = workers_needed - len (scheduled_workers)
-                    
-                # there's a chance we still need more people but we just don't have them.
-
-                ps.add_workers_to_slot(timeslot, campus, scheduled_workers)
-
-        return ps
-
-
-    def successor(self, ps, n_changes):
-
-        child = PotentialSchedule(ps.worker_capacity, ps.shifts, ps.worker_slotted_hrs, ps.schedule)
-
-
-
-
-        for campus in (0,1):
-
-            not_negative =      lambda x: x[1][campus] != -1
-            has_more_hours =    lambda x: child.allotted_more_hours(x)
-            positive_priority = lambda x: x[1][campus] > 0
-            
-            nonzero_shifts = list(filter(lambda x: ps.shifts[x][campus], ps.shifts.keys()))
-            
-            reroll_shifts = r.sample(nonzero_shifts, n_changes)
-            for timeslot in reroll_shifts:
-                
-                for worker in ps.schedule[campus][timeslot]:
-
-                    child.worker_slotted_hrs[worker[0]] -= 1
-
-                child.schedule[campus][timeslot] = []
-
-            for timeslot in reroll_shifts:
-                
-                
-                available_workers = list(filter(lambda x: not_negative(x) and has_more_hours(x), self.worker_constraints[timeslot].items()))
-
-                worker_count = min(len(available_workers), ps.shifts[timeslot][campus])
-                
-                child.add_workers_to_slot(timeslot, campus, r.sample(available_workers, worker_count))
-
-        return child
-
-
-    def write_schedule_to_spreadsheet(self, ps):
-
-        wb = op.open(MSC_TUTOR_SCHEDULE_FILENAME)
-        ws = wb.active
-        for campus in (0,1):
-            ws = wb[["CSB","SJU"][campus]]
-            for timeslot, workers in ps.schedule[campus].items():
-                if len(workers) == 0:
-                    ws.cell(timeslot[0],timeslot[1]).value = "-"
-                else:
-                    ws.cell(timeslot[0],timeslot[1]).value = ",\n".join(x[0] for x in workers)
-
-        wb.save(MSC_TUTOR_SCHEDULE_FILENAME)
-        wb.close()
-        
-        pass
-
-    def write_constraints_to_spreadsheet(self):
-        wb = op.open(MSC_CONSTRAINTS_FILENAME)
-        ws = wb.active
-        for campus in (0,1):
-            ws = wb[["CSB","SJU"][campus]]
-            for timeslot, constraints in self.worker_constraints.items():
-                if not self.shifts[timeslot][campus]:
-                    ws.cell(timeslot[0],timeslot[1]).value = None
-                    continue
-                people = ""
-                for worker, preference in constraints.items():
-                    if preference[campus] > 0:
-                        people += worker + f": {preference[campus]}\n "
-                if people == "":
-                    for worker, preference in constraints.items():
-                        if preference[campus] == 0:
-                            people += worker + f": {preference[campus]}\n "
-                ws.cell(timeslot[0],timeslot[1]).value = people
-
-        wb.save(MSC_CONSTRAINTS_FILENAME)
-        ws = wb.active
-
-class PotentialSchedule:
-
-    def __init__(self, wc, shifts, wsh = None, s = None):
-        self.worker_capacity = wc.copy() #person: (preferred, allotted, open)
-        
-        if wsh == None:
-            self.worker_slotted_hrs = dict() #person: n
-        else:
-            self.worker_slotted_hrs = wsh.copy()
-
-            
-        self.shifts = shifts.copy()
-
-
-        if s == None:
-            self.schedule = [dict(),dict()] #CSB,SJU (hour,day) : [(person, preference)]
-        else:
-            self.schedule = [s[0].copy(),s[1].copy()]
-        
-            
-    def desires_more_hours(self, worker):
-        """
-        Returns true if the scheduler has not yet filled this workers desired
-        hours.
-        """
-        current_hrs = self.worker_slotted_hrs.setdefault(worker[0], 0)
-        desired_hrs = self.worker_capacity[worker[0]][0]
-        return current_hrs < desired_hrs
-
-
-    def allotted_more_hours(self, worker):
-        """
-        Returns true if the scheduler has not yet filled this workers allotted
-        hours.
-        """
-        current_hrs = self.worker_slotted_hrs.setdefault(worker[0], 0)
-        allotted_hrs = self.worker_capacity[worker[0]][1]
-        return current_hrs < allotted_hrs
-
-    def add_workers_to_slot(self, timeslot, campus, workers):
-        """
-        Places workers into the schedule, and updates workers' hour counts.
-        """
-        for worker in workers:
-            current_hrs = self.worker_slotted_hrs.setdefault(worker[0],0)
-            self.worker_slotted_hrs[worker[0]] += 1
-
-        current_workers = self.schedule[campus].setdefault(timeslot, [])
-        current_workers.extend(workers)
-
-    def count_gaps(self):
-        gaps = 0
-        for campus in (0,1):
-            for timeslot in self.schedule[campus].keys():
-                holes = self.shifts[timeslot][campus] - len(self.schedule[campus][timeslot])
-                gaps += holes
-        return gaps
-
-    def geometric_mean_desired(self):
-        
-        accum = 1
-        count = 0
-        for worker, prefs in self.worker_capacity.items():
-            count += 1
-
-            proportion = self.worker_slotted_hrs[worker] / prefs[0]
-
-
-            # no bonus points for working more than you want to.
-            # going past is just as bad as going below.
-            regulated = 1 - abs(proportion - 1)
-            
-            accum*= proportion
-
-        return pow(accum, 1/count)
-
-    def mean_desired_weighted(self):
-        count = 0
-        accum = 0
-        for worker, prefs in self.worker_capacity.items():
-            proportion = self.worker_slotted_hrs[worker] / prefs[0]
-            
-            if prefs[2]/prefs[0] > 2: #if you don't have many open hours, your desires aren't counted
-                accum += proportion
-                count += 1
-
-        return accum /count
-
-    def avg_priority(self):
-        count = 0
-        accum = 0
-        for campus in (0,1):
-            for shift in self.schedule[campus].values():
-                for person in shift:
-                    if person[1][campus] == 1:
-                        accum += 2
-                    elif person[1][campus] == 2:
-                        accum += 1
-                    count += 1
-
-        return accum / count
-
-    def min_hrs_filled(self):
-        return min(self.worker_slotted_hrs.values())
-
-    def min_hrs_proportion(self):
-        return min(self.worker_slotted_hrs[worker] / prefs[0] for worker, prefs in self.worker_capacity.items())
-
-    def avg_trips_in(self):
-        n_times = 0
-        for campus in (0,1):
-            for timeslot in self.schedule[campus].keys():
-                workers = self.schedule[campus][timeslot]
-                for worker in workers:
-                    if worker not in self.schedule[campus][(timeslot[0]-1,timeslot[1])]:
-                        n_times += 1
-        return n_times/ len(self.worker_capacity)
-
-
-    def report_scores(self):
-        out = ""
-        out += f" Avg Priority: {self.avg_priority():.2f}\n"
-        out += f" Total hours filled: {sum(self.worker_slotted_hrs.values())}\n"
-        out += f" Min hrs filled: {self.min_hrs_filled()}\n"
-        out += f" Min hrs proportion: {self.min_hrs_proportion()}\n"
-        out += f" Mean desired (weighted) filled: {self.mean_desired_weighted():.2f}\n"
-        out += f" Mean trips in: {self.avg_trips_in():.2f}\n"
-        out += f" Geom mean desired: {self.geometric_mean_desired():.2f}\n"
-        out += f" Gaps in schedule: {self.count_gaps():.2f}\n"
-        out += f" Score: {-self.evaluate():.2f}\n\n"
-        return out
-
-    def report_workers(self):
-
-        workers = list(self.worker_capacity.keys())
-        
-        proportion = lambda worker: self.worker_slotted_hrs[worker]/self.worker_capacity[worker][0]
-        
-        workers.sort(key = proportion, reverse = True)
-
-        out = ""
-        for worker in workers:
-            prefs = self.worker_capacity[worker]#person: (preferred, allotted, open)
-            scheduled = self.worker_slotted_hrs[worker]
-            out += f"{worker} \n- Desired: {prefs[0]:>2} Scheduled: {scheduled:>2} Proportion: {proportion(worker):>4.2f} Open: {prefs[2]}\n"
-            
-        return out
-
-    def report(self):
-        print(self.report_scores())
-        print(self.report_workers())
-
-    def write_report(self):
-        report = open("report.txt", "w")
-        report.write(self.report_scores())
-        report.write(self.report_workers())
-        report.close()
-        
-        
-
-    def evaluate(self):
-
-        score = 0
-
-        score += self.count_gaps() * -1000
-
-        score += self.min_hrs_filled() * 100
-
-        score += self.min_hrs_proportion() ** 2 * 100
-
-        score += sum(self.worker_slotted_hrs.values())
-
-
-
-        score /= self.avg_trips_in()     #[1,12+)
-
-        score *= self.avg_priority() ** 2 + 1   #[0,2]
-
-        score *= self.mean_desired_weighted() + 1 
-
-        return -score
-            
-        
-        
-if __name__ == "__main__":
-    sm = ScheduleManager()
-    sm.initialize()        
-    sm.load_msc_schedule()
-    sm.import_worker_schedules()
-    ps = sm.create_default_schedule()
-    ps.report()
-
+import random as r, openpyxl as op, os, heapq, zipfile, re, datetime
+from concurrent.futures import ProcessPoolExecutor
+from openpyxl.utils import get_column_letter
+from formcache import FormCache, CACHE_FILENAME
+
+
+
+# where the table of timeslots is, for workbooks without a "Time" header to find it by
+CONFIG_TABLE_ROW_START = 9
+CONFIG_TABLE_COLUMN_START = 2
+CONFIG_TABLE_ROW_END = 22
+CONFIG_TABLE_COLUMN_END = 8
+TIME_HEADER = 'time' #the table's corner cell: timeslots run down from it, days across
+TUTOR_NAME_CELL = (3,3)
+TUTOR_WORK_AWARD_CELL = (3,8)
+TUTOR_DESIRED_HOURS_CELL = (5,8)
+
+MSC_WORKERS_NEEDED_FILENAME = 'MSC Hours of Operation.xlsx'
+AVAILABILITY_FOLDER_NAME = 'student availability'
+
+MSC_CONSTRAINTS_FILENAME = 'MSC Tutor Constraints.xlsx'
+MSC_TUTOR_SCHEDULE_FILENAME = 'MSC Tutor Schedule.xlsx'
+REPORT_FILENAME = 'report.txt'
+
+MAX_AWARD = 15
+
+MIN_FORMS = 5 #fewer availability forms than this isn't worth scheduling
+
+PARALLEL_PARSE_MIN_FILES = 24 #below this many forms, starting a process pool costs more than it saves
+
+PRIORITY_LEVELS = (1, 2, 0) #first, second, and third priorities, in the order they're scheduled
+
+DEFAULT_CAMPUSES = ('CSB', 'SJU') #always known; a bare number in a cell means the first one
+TIME_PATTERN = re.compile(r"(\d{1,2})(?::(\d{2}))?") #a time in a Time label, eg. the 7 or 7:30 of "7:30 am - 8 am"
+SLOT_HOURS = 1 #how long a timeslot lasts, when the Time labels don't say
+COUNT_PATTERN = re.compile(r"(\d+)\s*([^\W\d_]+)") #a number and the campus after it, with or without a space
+
+class ScheduleManager:
+
+    def __init__(self, directory = ".", use_cache = True):
+        self.directory = directory        #folder holding the configuration spreadsheets and availability forms
+        self.cache = FormCache(self.path(CACHE_FILENAME)) if use_cache else None
+        self.loaded = False
+        self.worker_capacity = dict() #person: (preferred, allotted, open)
+        self.worker_constraints = dict()  #time,day  : dict(name, pref)
+        self.shifts = dict()              #time,day  : (workers needed at each campus)
+        self.campuses = DEFAULT_CAMPUSES  #campus names, in the order they're indexed by everywhere else
+        self.grid = None                  #(first row, last row, first column, last column) of the timeslot table
+        self.slot_hours = SLOT_HOURS      #hours each timeslot lasts; worker_capacity counts timeslots, not hours
+        self.total_available_hours = 0
+        self.candidates = dict()          #(time,day), campus : {priority: ((name, pref), ...)}
+        self.eligible_workers = dict()    #(time,day), campus : ((name, pref), ...) of any priority
+        self.staffed_shifts = ((), ())    #campus : timeslots that need workers
+        self.slot_bit = dict()            #(time,day) : its bit in the bitsets below
+        self.available_bits = dict()      #person : bitset of the timeslots they can work, at each campus
+        self.forms = dict()               #availability form : (size, modification time, name of the worker it loaded, or None)
+
+    def path(self, fn):
+        """
+        Where a file or folder named fn lives, inside the working directory.
+        """
+        return os.path.join(self.directory, fn)
+
+    def initialize(self, min_forms = MIN_FORMS):
+        """
+        Checks if all the dependent files and folders are set up and ready,
+        with at least min_forms availability forms.
+        """
+
+        # if we cannot find the hours of operation file, that's a problem
+        # if we cannot find the folder with the availability, that's a problem.
+        # if we cannot find the folder to put the used availabilities, that's a problem
+
+        curdir = os.path.abspath(self.directory)
+
+        if not os.path.isdir(curdir):
+            print(f"The folder {curdir} doesn't exist.")
+            return False
+
+        contents = os.listdir(self.directory)
+
+        all_good = True
+
+        if not MSC_WORKERS_NEEDED_FILENAME in contents:
+            print(f"'{MSC_WORKERS_NEEDED_FILENAME}' is a dependency of this program, please place that file into the same folder as this script: {curdir}")
+            all_good = False
+        if not AVAILABILITY_FOLDER_NAME in contents:
+            print(f"'{AVAILABILITY_FOLDER_NAME}' folder is a dependency of this program. I've created that folder, place tutor availability forms into that folder.")
+            os.mkdir(self.path(AVAILABILITY_FOLDER_NAME))
+            all_good = False
+
+        if len(os.listdir(self.path(AVAILABILITY_FOLDER_NAME))) < min_forms:
+            file_count = os.listdir(self.path(AVAILABILITY_FOLDER_NAME))
+            print(f"Not enough files found in the folder {AVAILABILITY_FOLDER_NAME} to continue executing. \n Found: {file_count} \t Minimum: {min_forms}.")
+            all_good = False
+
+        return all_good
+        
+
+    def load_msc_schedule(self):
+        """
+        loads the hours the MSC is open and how many workers are needed at each time
+        and campus from the configuration spreadsheet. The campuses and the
+        grid of timeslots come from the spreadsheet too.
+        """
+        fn = self.path(MSC_WORKERS_NEEDED_FILENAME)
+
+        operation = None
+        if self.cache is not None:
+            operation = self.cache.lookup(MSC_WORKERS_NEEDED_FILENAME, fn)
+        if operation is None:
+            operation = self.read_shifts(fn)
+            if self.cache is not None:
+                self.cache.store(MSC_WORKERS_NEEDED_FILENAME, fn, operation)
+                self.cache.save()
+
+        self.grid, self.campuses, shifts, self.slot_hours = operation
+
+        totalAvailableHours = 0
+
+        for timeslot, workers_needed in shifts.items(): # (workers needed at each campus)
+            totalAvailableHours += sum(workers_needed)
+            self.shifts[timeslot] = workers_needed
+            self.worker_constraints.setdefault(timeslot, dict())
+
+        self.total_available_hours = totalAvailableHours * self.slot_hours
+                
+        return True
+
+    def read_shifts(self, fn):
+        """
+        Reads how many workers are needed at each time from the configuration
+        spreadsheet. Returns the grid the timeslots were found in, the
+        campuses, (hour,day) : (workers needed at each campus), and the hours
+        each timeslot lasts.
+
+        The campuses are the default ones, followed by any others the
+        spreadsheet names, in the order they first come up.
+        """
+        wb = op.open(fn)
+        ws = wb.active
+
+        grid = find_time_grid(ws)
+        first_row, last_row, first_column, last_column = grid
+        slot_hours = slot_length([ws.cell(hour, first_column - 1).value for hour in range(first_row, last_row + 1)])
+
+        demands = dict() #(hour,day) : {campus : workers needed}
+        for hour in range(first_row, last_row + 1):
+            for day in range(first_column, last_column + 1):
+                try:
+                    cell = ws.cell(hour,day)
+
+                    workers_needed = self.parse_configuration_cell(cell)  # {campus : n}
+
+                    if workers_needed is None:
+                        raise ValueError("the cell is blank")
+                    demands[(hour,day)] = workers_needed
+                except Exception as e:
+                    raise ValueError(f"Error found in spreadsheet at cell {(hour,day)}:", e)
+
+        wb.close()
+
+        campuses = list(DEFAULT_CAMPUSES)
+        for workers_needed in demands.values():
+            campuses.extend(campus for campus in workers_needed if campus not in campuses)
+
+        shifts = {timeslot: tuple(workers_needed.get(campus, 0) for campus in campuses) for timeslot, workers_needed in demands.items()}
+        return grid, tuple(campuses), shifts, slot_hours
+
+    def parse_configuration_cell(self, cell):
+        """
+        Reads the workers needed in a cell, eg. "1 CSB, 2 SJU", as
+        {campus : n}. A bare number means the first campus.
+        """
+        v = cell.value
+        if v == None:
+            return None
+        if type(v) == int or type(v) == float: #given no labels, default to the first campus; floor floats to an int
+            return {DEFAULT_CAMPUSES[0]: int(v)}
+
+        workers_needed = dict()
+        for part in v.split(","):
+            if not part.strip():
+                continue
+            count = None
+            campus = None
+            for token in split_count(part).split():
+                if token.isdecimal() and count is None:
+                    count = int(token)
+                elif not token.isdecimal() and campus is None:
+                    campus = token.upper()
+                else:
+                    raise ValueError(f"Configuration spreadsheet has improper values within the table: '{v}' needs a comma between each campus.")
+            if count is None:
+                raise ValueError("Configuration spreadsheet has improper values within the table: recieved a non-integer.")
+            campus = campus or DEFAULT_CAMPUSES[0]
+            if campus in workers_needed:
+                raise ValueError(f"Configuration spreadsheet has improper values within the table: '{v}' names {campus} twice.")
+            workers_needed[campus] = count
+        return workers_needed
+            
+
+    def import_worker_schedules(self):
+        """
+        Reads the worker availability forms and loads them into the schedule constraints.
+        Loops through the specified directory for .xlsx files, and sends them to parse,
+        across a process pool when there are enough of them to be worth it.
+        Forms that haven't changed since the last run come from the cache instead.
+        """
+
+        keys = self.form_keys(warn = True)
+
+        layout = (self.grid, self.campuses) #forms read against another grid or other campuses need reading again
+
+        forms = dict() #key : parsed form, for the unchanged forms
+        if self.cache is not None:
+            for key in keys:
+                cached = self.cache.lookup(key, self.path(key))
+                if cached is not None and cached[0] == layout:
+                    forms[key] = cached[1]
+
+        paths = [self.path(key) for key in keys if key not in forms]
+        if len(paths) >= PARALLEL_PARSE_MIN_FILES:
+            with ProcessPoolExecutor() as pool:
+                results = list(pool.map(try_reading_availability_form, paths, [self.grid] * len(paths), [self.campuses] * len(paths), chunksize = 8))
+        else:
+            results = [try_reading_availability_form(fn, self.grid, self.campuses) for fn in paths]
+
+        all_good = True
+        for key, (fn, form, error) in zip([key for key in keys if key not in forms], results):
+            if error is None:
+                forms[key] = form
+                if self.cache is not None:
+                    self.cache.store(key, fn, (layout, form))
+            else:
+                all_good = False
+                print(f"Something's wrong in this file: {fn}\n" + error)
+
+        for key in keys:
+            self.forms[key] = (*form_stamp(self.path(key)), forms[key][0] if key in forms else None)
+            if key in forms:
+                self.add_worker(*forms[key])
+
+        if self.cache is not None:
+            self.cache.prune(AVAILABILITY_FOLDER_NAME, keys)
+            self.cache.save()
+                
+        self.build_candidate_index()
+
+        return all_good
+
+    def form_keys(self, warn = False):
+        """
+        The availability forms in the folder, as paths inside the working
+        directory. Excel's lock files for open workbooks are skipped.
+        """
+        keys = []
+        for fn in os.listdir(self.path(AVAILABILITY_FOLDER_NAME)):
+            if ".xlsx" in fn and not fn.startswith("~$"):
+                keys.append(os.path.join(AVAILABILITY_FOLDER_NAME, fn))
+            elif warn:
+                print(f"WARNING: Non-spreadsheet file found in {AVAILABILITY_FOLDER_NAME}:  {fn}")
+        return keys
+
+    def update_worker_schedules(self):
+        """
+        Brings the schedule constraints up to date with the availability
+        folder, patching them in place: only the forms added or changed since
+        they were last read are read again, and the workers whose forms were
+        removed, or whose names changed on their form, are dropped.
+
+        Returns the forms (added, changed, removed).
+        """
+        keys = self.form_keys()
+        added, changed, removed = self.form_changes(keys)
+
+        for key in changed + removed:
+            self.drop_form(key)
+
+        layout = (self.grid, self.campuses)
+        for key in added + changed:
+            fn = self.path(key)
+            try:
+                stamp = form_stamp(fn)
+            except OSError:
+                continue #gone again already, which the next update will see
+            form = None
+            if self.cache is not None:
+                cached = self.cache.lookup(key, fn)
+                if cached is not None and cached[0] == layout:
+                    form = cached[1]
+            if form is None:
+                try:
+                    fn, form, error = try_reading_availability_form(fn, self.grid, self.campuses)
+                except Exception as e: #anything else an odd workbook throws: one bad form mustn't stop the others, or a watch
+                    error = f"It can't be read: {e!r}"
+                if error is not None:
+                    # remembered anyway, so it's only reported again once it's saved again
+                    print(f"Something's wrong in this file: {fn}\n" + error)
+                    self.forms[key] = (*stamp, None)
+                    continue
+                if self.cache is not None:
+                    self.cache.store(key, fn, (layout, form))
+            self.forms[key] = (*stamp, form[0])
+            self.add_worker(*form)
+
+        if added or changed or removed:
+            if self.cache is not None:
+                self.cache.prune(AVAILABILITY_FOLDER_NAME, keys)
+                self.cache.save()
+            self.build_candidate_index()
+
+        return added, changed, removed
+
+    def form_changes(self, keys = None):
+        """
+        The forms (added, changed, removed) since they were last read, going
+        by their size and modification time, without reading any.
+        """
+        if keys is None:
+            keys = self.form_keys()
+        added = [key for key in keys if key not in self.forms]
+        changed = [key for key in keys if key in self.forms and self.forms[key][:2] != form_stamp(self.path(key))]
+        removed = [key for key in self.forms if key not in keys]
+        return added, changed, removed
+
+    def drop_form(self, key):
+        """
+        Forgets an availability form, and the worker it loaded unless another
+        form loaded them too.
+        """
+        worker_name = self.forms.pop(key)[2]
+        if worker_name is not None and all(form[2] != worker_name for form in self.forms.values()):
+            self.remove_worker(worker_name)
+
+    def build_candidate_index(self):
+        """
+        Sorts out, once, who can work each timeslot at each campus, bucketed by
+        priority, and which timeslots need workers at each campus. Schedule
+        construction and rerolls sample straight from these instead of
+        filtering the constraints every time.
+
+        Also lays each worker's availability out as a bitset over the
+        timeslots per campus (see slot_bits), so whether they can work a
+        slot is one bit test.
+
+        Needs rebuilding whenever the constraints or shifts change.
+        """
+        candidates = dict()
+        eligible_workers = dict()
+        self.slot_bit = slot_bits(self.shifts)
+        available_bits = {worker: [0] * len(self.campuses) for worker in self.worker_capacity} #person : bitset per campus
+
+        for timeslot, constraints in self.worker_constraints.items():
+            for campus in range(len(self.campuses)):
+                buckets = {priority: [] for priority in PRIORITY_LEVELS}
+                eligible = []
+                for worker in constraints.items(): #(name, (priority at each campus))
+                    priority = worker[1][campus]
+                    if priority == -1:
+                        continue
+                    eligible.append(worker)
+                    available_bits[worker[0]][campus] |= self.slot_bit[timeslot]
+                    if priority in buckets:
+                        buckets[priority].append(worker)
+
+                candidates[(timeslot, campus)] = {priority: tuple(bucket) for priority, bucket in buckets.items()}
+                eligible_workers[(timeslot, campus)] = tuple(eligible)
+
+        self.candidates = candidates
+        self.eligible_workers = eligible_workers
+        self.available_bits = available_bits
+        self.staffed_shifts = tuple(tuple(timeslot for timeslot, workers_needed in self.shifts.items() if workers_needed[campus])
+                                    for campus in range(len(self.campuses)))
+
+    
+    def parse_availability_form(self, fn):
+        """
+        Parses an availability form and loads the data into the schedule constraints.
+        """
+        self.add_worker(*read_availability_form(fn, self.grid, self.campuses))
+
+    def add_worker(self, worker_name, capacity, preferences):
+        """
+        Loads one worker's parsed availability into the schedule constraints.
+        Their desired and allotted hours are counted in timeslots from here on.
+        """
+        for timeslot, preference in preferences.items():
+            self.worker_constraints[timeslot][worker_name] = preference
+
+        desired_hours, award_hours, open_slots = capacity
+        self.worker_capacity[worker_name] = (self.hours_to_slots(desired_hours), self.hours_to_slots(award_hours), open_slots)
+
+    def hours_to_slots(self, hours):
+        """
+        How many timeslots make up that many hours, rounded to the nearest,
+        but never rounded down to none.
+        """
+        if not hours:
+            return 0
+        return max(round(hours / self.slot_hours), 1)
+
+    def remove_worker(self, worker_name):
+        """
+        Takes a worker back out of the schedule constraints.
+        """
+        for constraints in self.worker_constraints.values():
+            constraints.pop(worker_name, None)
+
+        del self.worker_capacity[worker_name]
+
+    def create_default_schedule(self, rng = r):
+        """Takes into account the loaded schedule constraints and develops
+        a schedule that satisfies them.
+
+        Slots are filled most constrained first: the ones with the fewest
+        workers still able to take them per worker needed, so scarce slots
+        aren't starved by easy ones filled before them. Each slot takes the
+        workers who still want more hours first, then by priority, then
+        whoever is furthest from their desired hours.
+
+        Uses randomness to break ties, to reduce inherent bias from hash or
+        alphabetical considerations, drawn from rng: pass a seeded
+        random.Random for a repeatable schedule.
+        """
+
+        slot_bit = self.slot_bit
+        bit_slot = {bit: timeslot for timeslot, bit in slot_bit.items()}
+        slotted = dict.fromkeys(self.worker_capacity, 0)
+        busy = dict.fromkeys(self.worker_capacity, 0)   #name : bitset of the timeslots they already work, at any campus
+        scheduled = dict()      #(timeslot, campus) : [(name, pref)]
+
+        # how many workers could still take each unfilled slot, and the slots each worker could still take
+        open_count = dict()     #(timeslot, campus) : n
+        worker_slots = dict()   #name : bitset of the timeslots at each campus
+        queue = []              #(open_count / workers needed, tie break, timeslot, campus)
+
+        for campus in range(len(self.campuses)):
+            for timeslot in self.staffed_shifts[campus]:
+                count = 0
+                for priority in PRIORITY_LEVELS:
+                    for worker in self.candidates[(timeslot, campus)][priority]:
+                        if self.worker_capacity[worker[0]][1] > 0:
+                            worker_slots.setdefault(worker[0], [0] * len(self.campuses))[campus] |= slot_bit[timeslot]
+                            count += 1
+                open_count[(timeslot, campus)] = count
+                queue.append((count / self.shifts[timeslot][campus], rng.random(), timeslot, campus))
+        heapq.heapify(queue)
+
+        while queue:
+            scarcity, tie, timeslot, campus = heapq.heappop(queue)
+            slot = (timeslot, campus)
+            workers_needed = self.shifts[timeslot][campus]
+
+            # skip slots already filled, and entries left behind by a slot getting scarcer
+            if slot not in open_count or scarcity != open_count[slot] / workers_needed:
+                continue
+            del open_count[slot]
+
+            bit = slot_bit[timeslot]
+            ranked = []
+            for rank, priority in enumerate(PRIORITY_LEVELS):
+                for worker in self.candidates[slot][priority]:
+                    desired, allotted = self.worker_capacity[worker[0]][:2]
+                    hrs = slotted[worker[0]]
+                    if hrs < allotted and not busy[worker[0]] & bit:
+                        ranked.append((hrs >= desired, rank, hrs / desired, rng.random(), worker))
+
+            # there's a chance we still need more people but we just don't have them.
+            scheduled[slot] = [x[-1] for x in heapq.nsmallest(workers_needed, ranked)]
+
+            for worker in scheduled[slot]:
+                name = worker[0]
+                slotted[name] += 1
+                busy[name] |= bit
+
+                # the worker can no longer take the other campuses this hour, or anything once out of hours
+                lost = bit if slotted[name] < self.worker_capacity[name][1] else -1
+                for other_campus, bits in enumerate(worker_slots[name]):
+                    lost_bits = bits & lost
+                    worker_slots[name][other_campus] = bits & ~lost
+                    while lost_bits:
+                        other = (bit_slot[lost_bits & -lost_bits], other_campus)
+                        lost_bits &= lost_bits - 1
+                        if other in open_count:
+                            open_count[other] -= 1
+                            heapq.heappush(queue, (open_count[other] / self.shifts[other[0]][other[1]], rng.random(), *other))
+
+        ps = PotentialSchedule(self.worker_capacity, self.shifts, slot_hours = self.slot_hours)
+        for campus in range(len(self.campuses)):
+            for timeslot in self.shifts.keys():
+                ps.add_workers_to_slot(timeslot, campus, scheduled.get((timeslot, campus), []))
+
+        return ps
+
+
+    def successor(self, ps, n_changes, rng = r):
+        """
+        Returns a copy of ps with some of its shifts rerolled. The annealer
+        uses reroll() instead, which avoids the copy.
+        """
+        child = ps.copy()
+        self.reroll(child, n_changes, rng)
+        child.commit_move()
+        return child
+
+    def reroll(self, ps, n_changes, rng = r):
+        """
+        Empties n_changes random staffed shifts per campus of ps (or all of a
+        campus' staffed shifts, if it has fewer) and randomly
+        refills them, in place. The change is left open as a move on ps:
+        follow up with ps.commit_move() to keep it or ps.revert_move() to
+        undo it. The shifts and workers are drawn from rng.
+        """
+        ps.start_move()
+
+        for campus, staffed in enumerate(self.staffed_shifts):
+
+            reroll_shifts = rng.sample(staffed, min(n_changes, len(staffed)))
+            for timeslot in reroll_shifts:
+                ps.clear_slot(timeslot, campus)
+
+            for timeslot in reroll_shifts:
+                
+                
+                available_workers = [x for x in self.eligible_workers[(timeslot, campus)] if ps.allotted_more_hours(x)]
+
+                worker_count = min(len(available_workers), ps.shifts[timeslot][campus])
+                
+                ps.add_workers_to_slot(timeslot, campus, rng.sample(available_workers, worker_count))
+
+    def propose_batch(self, ps, k, n_changes, rng = r):
+        """
+        Draws k rerolls of ps, each like reroll() would make, without making
+        any of them. Returns them as moves, (timeslot, campus) : workers the
+        slot would hold, for ps.score_moves() to score together and
+        ps.make_move() to make the one chosen.
+        """
+        slotted = ps.worker_slotted_hrs #read once: a DenseSchedule builds it on every read
+        moves = []
+        for i in range(k):
+            move = dict()
+            hours = dict() #person : hours the move takes off (-) or gives (+) them
+            for campus, staffed in enumerate(self.staffed_shifts):
+
+                reroll_shifts = rng.sample(staffed, min(n_changes, len(staffed)))
+                for timeslot in reroll_shifts:
+                    for worker in ps.slot_workers(timeslot, campus):
+                        hours[worker[0]] = hours.get(worker[0], 0) - 1
+
+                for timeslot in reroll_shifts:
+                    available_workers = [x for x in self.eligible_workers[(timeslot, campus)]
+                                         if slotted[x[0]] + hours.get(x[0], 0) < self.worker_capacity[x[0]][1]]
+
+                    worker_count = min(len(available_workers), ps.shifts[timeslot][campus])
+
+                    workers = rng.sample(available_workers, worker_count)
+                    for worker in workers:
+                        hours[worker[0]] = hours.get(worker[0], 0) + 1
+                    move[(timeslot, campus)] = workers
+            moves.append(move)
+        return moves
+
+    def write_schedule_to_spreadsheet(self, ps, fn = None):
+        """
+        Fills the schedule template with ps, saving it to fn, or over the
+        template itself if fn isn't given.
+        """
+
+        wb = op.open(self.path(MSC_TUTOR_SCHEDULE_FILENAME))
+        self.fill_sheets(wb, self.schedule_cells(ps))
+        wb.save(fn or self.path(MSC_TUTOR_SCHEDULE_FILENAME))
+        wb.close()
+
+    def schedule_cells(self, ps):
+        """
+        What the schedule template's cells hold for ps: campus : (hour,day) : value.
+        Every timeslot gets a value, "-" if nobody is in it.
+        """
+        cells = []
+        for slots in ps.schedule:
+            workers = lambda timeslot: slots.get(timeslot, [])
+            cells.append({timeslot: ",\n".join(x[0] for x in workers(timeslot)) or "-" for timeslot in self.shifts})
+        return cells
+
+    def constraint_cells(self):
+        """
+        What the constraints template's cells hold: campus : (hour,day) : value.
+        """
+        cells = []
+        for campus in range(len(self.campuses)):
+            values = dict()
+            for timeslot, constraints in self.worker_constraints.items():
+                if not self.shifts[timeslot][campus]:
+                    values[timeslot] = None
+                    continue
+                # first and second priorities, or third priorities if nobody else can
+                people = [worker for worker in constraints.items() if worker[1][campus] > 0]
+                if not people:
+                    people = [worker for worker in constraints.items() if worker[1][campus] == 0]
+                values[timeslot] = "".join(f"{worker}: {preference[campus]}\n " for worker, preference in people)
+            cells.append(values)
+        return cells
+
+    def fill_sheets(self, wb, cells):
+        """
+        Writes cell values, campus : (hour,day) : value, into a template's
+        campus sheets, each in one pass over its table of timeslots. Cells
+        without a value are left as they are.
+        """
+        first_row, last_row, first_column, last_column = self.grid
+        for campus, values in enumerate(cells):
+            ws = campus_sheet(wb, self.campuses[campus])
+            for row in ws.iter_rows(min_row = first_row, max_row = last_row, min_col = first_column, max_col = last_column):
+                for cell in row:
+                    timeslot = (cell.row, cell.column)
+                    if timeslot in values:
+                        cell.value = values[timeslot]
+
+    def read_schedule_from_spreadsheet(self, fn = None):
+        """
+        Reads a schedule written by write_schedule_to_spreadsheet back in,
+        from fn or the schedule workbook in the folder. Returns the names in
+        every staffed slot, per campus: [{(hour,day) : [name]}]. A campus
+        without a sheet of its own comes back empty.
+        """
+        wb = op.open(fn or self.path(MSC_TUTOR_SCHEDULE_FILENAME))
+        names = [dict() for campus in self.campuses]
+        for campus in range(len(self.campuses)):
+            if self.campuses[campus] not in wb.sheetnames:
+                continue
+            ws = wb[self.campuses[campus]]
+            for timeslot in self.staffed_shifts[campus]:
+                value = ws.cell(timeslot[0],timeslot[1]).value
+                if isinstance(value, str) and value.strip() != "-":
+                    names[campus][timeslot] = [name.strip() for name in value.split(",") if name.strip()]
+        wb.close()
+        return names
+
+    def write_constraints_to_spreadsheet(self, fn = None):
+        """
+        Fills the constraints template with who can work each shift, saving it
+        to fn, or over the template itself if fn isn't given.
+        """
+        wb = op.open(self.path(MSC_CONSTRAINTS_FILENAME))
+        self.fill_sheets(wb, self.constraint_cells())
+        wb.save(fn or self.path(MSC_CONSTRAINTS_FILENAME))
+        wb.close()
+
+def find_time_grid(ws):
+    """
+    Finds the table of timeslots in a worksheet by its "Time" header: days
+    run across from it until the first blank header, and timeslots down
+    from it until the first blank time. Returns (first row, last row, first
+    column, last column) of the table's cells, or the default table if
+    there's no header.
+    """
+    for row in ws.iter_rows(min_col = 1, max_col = 1):
+        header = row[0]
+        if str(header.value).strip().lower() != TIME_HEADER:
+            continue
+
+        last_column = header.column
+        while ws.cell(header.row, last_column + 1).value not in (None, ""):
+            last_column += 1
+        last_row = header.row
+        while ws.cell(last_row + 1, header.column).value not in (None, ""):
+            last_row += 1
+
+        if last_column > header.column and last_row > header.row:
+            return (header.row + 1, last_row, header.column + 1, last_column)
+
+    return (CONFIG_TABLE_ROW_START, CONFIG_TABLE_ROW_END, CONFIG_TABLE_COLUMN_START, CONFIG_TABLE_COLUMN_END)
+
+def slot_length(labels):
+    """
+    Reads how many hours a timeslot lasts from the Time labels down the side
+    of the table, eg. 0.5 for "7 am - 7:30 am". A label gives it by its start
+    and end time, or failing that, by how far it starts after the one before.
+    Labels that don't say give SLOT_HOURS.
+    """
+    starts = []
+    for label in labels:
+        if isinstance(label, (datetime.time, datetime.datetime)):
+            starts.append(label.hour * 60 + label.minute)
+            continue
+        times = [int(hour) * 60 + int(minute or 0) for hour, minute in TIME_PATTERN.findall(str(label))]
+        if len(times) >= 2 and (times[1] - times[0]) % 720: #am and pm don't matter, for a slot under 12 hours
+            minutes = (times[1] - times[0]) % 720
+            break
+        starts.append(times[0] if times else None)
+    else:
+        steps = [(later - earlier) % 720 for earlier, later in zip(starts, starts[1:]) if earlier is not None and later is not None]
+        steps = [step for step in steps if step]
+        if not steps:
+            return SLOT_HOURS
+        minutes = min(steps)
+
+    hours = minutes / 60
+    return int(hours) if hours == int(hours) else hours
+
+def campus_sheet(wb, campus):
+    """
+    The worksheet for a campus in an output workbook. A campus without one
+    gets a copy of the first sheet.
+    """
+    if campus in wb.sheetnames:
+        return wb[campus]
+    ws = wb.copy_worksheet(wb.worksheets[0])
+    ws.title = campus
+    return ws
+
+def read_availability_form(fn, grid = None, campuses = DEFAULT_CAMPUSES):
+    """
+    Reads an availability form. Returns the worker's name, their
+    (preferred, allotted, open) hours, and their preference for every
+    timeslot they're open: (hour,day) : (priority at each campus).
+
+    The form is read over the same grid of timeslots as the hours of
+    operation (the default table if not given), against the same campuses.
+
+    The workbook is opened read-only and the cells come out of a single
+    iter_rows pass, instead of being looked up one by one.
+    """
+    if grid is None:
+        grid = (CONFIG_TABLE_ROW_START, CONFIG_TABLE_ROW_END, CONFIG_TABLE_COLUMN_START, CONFIG_TABLE_COLUMN_END)
+    table_first_row, table_last_row, table_first_column, table_last_column = grid
+
+    cells = (TUTOR_NAME_CELL, TUTOR_WORK_AWARD_CELL, TUTOR_DESIRED_HOURS_CELL,
+             (table_first_row, table_first_column), (table_last_row, table_last_column))
+    first_row = min(cell[0] for cell in cells)
+    first_column = min(cell[1] for cell in cells)
+
+    wb = op.load_workbook(fn, read_only = True, data_only = True)
+    try:
+        rows = list(wb.active.iter_rows(min_row = first_row, max_row = max(cell[0] for cell in cells),
+                                        min_col = first_column, max_col = max(cell[1] for cell in cells),
+                                        values_only = True))
+    finally:
+        wb.close()
+
+    # iter_rows stops at the last cell filled in, so a blank or short form comes back with fewer rows or columns
+    width = max(cell[1] for cell in cells) - first_column + 1
+    rows = [tuple(row) + (None,) * (width - len(row)) for row in rows]
+    rows += [(None,) * width] * (max(cell[0] for cell in cells) - first_row + 1 - len(rows))
+
+    value = lambda cell: rows[cell[0] - first_row][cell[1] - first_column]
+
+    worker_name = value(TUTOR_NAME_CELL)
+    worker_name = str(worker_name).strip()
+
+    if worker_name in ("", "None"):
+        raise ValueError("Worker name field left blank.")
+
+    try:
+        award_hours = int(value(TUTOR_WORK_AWARD_CELL))
+        desired_hours = int(value(TUTOR_DESIRED_HOURS_CELL))
+    except TypeError:
+        raise ValueError("Work award or desired hours left blank.")
+
+    if (award_hours <= 0): 
+        raise ValueError(f"Improper number of work award hours: {award_hours}.")
+    if award_hours > MAX_AWARD:
+        raise ValueError(f"Improper number of work award hours: maximum exceeded: {MAX_AWARD}.")
+
+    if desired_hours < 0:
+        raise ValueError(f"Improper number of desired hours: {desired_hours}.")
+    if desired_hours > award_hours:
+        raise ValueError(f"Improper number of desired hours; exceeds work award: {desired_hours}.")
+
+    preferences = dict()
+    error_spots = []
+    for hour in range(table_first_row, table_last_row + 1):
+        for day in range(table_first_column, table_last_column + 1):
+            preference = parse_worker_preference(value((hour,day)), campuses) #(priority at each campus)
+
+            if type(preference) == tuple:
+                preferences[(hour,day)] = preference
+            elif preference == "e":
+                error_spots.append(get_column_letter(day) + str(hour))
+            #elif preference == None do nothing
+
+    if len(error_spots) > 0:
+        raise ValueError("Improper entries in the following cells: \n" + "\n".join(error_spots))
+
+    return worker_name, (desired_hours, award_hours, len(preferences)), preferences
+
+def form_stamp(fn):
+    """
+    (size, modification time) of a file, to tell when it has changed.
+    """
+    stat = os.stat(fn)
+    return stat.st_size, stat.st_mtime_ns
+
+def try_reading_availability_form(fn, grid = None, campuses = DEFAULT_CAMPUSES):
+    """
+    read_availability_form for a process pool: returns (fn, form, None), or
+    (fn, None, error message) if the form has a problem, so one bad form
+    doesn't stop the others from loading.
+    """
+    try:
+        return fn, read_availability_form(fn, grid, campuses), None
+    except ValueError as ve:
+        return fn, None, str(ve)
+    except (OSError, zipfile.BadZipFile) as e: #eg. a form still being copied in
+        return fn, None, f"It can't be opened as a workbook: {e}"
+
+def split_count(v):
+    """
+    Puts a space between a number and the campus right after it, so "1csb"
+    reads the same as "1 csb".
+    """
+    return COUNT_PATTERN.sub(r"\1 \2", v)
+
+def parse_worker_preference(v, campuses = DEFAULT_CAMPUSES):
+    """
+    Scans a cell's value and returns the preferences of the worker: their
+    priority at each campus, -1 where they can't work. Entries look like
+    "1 CSB", "2 SJU" or "0 CSB or SJU"; a bare number means the first campus.
+
+    Returns None if they can't work then, or "e" if the entry makes no sense.
+    """
+    if v == None:
+        return None
+    if type(v) == int or type(v) == float: #given no labels, default to the first campus; floor floats to an int
+        return (int(v),) + (-1,) * (len(campuses) - 1)
+
+    v = v.lower()
+    if "x" in v or "-" in v: #crossed out, however it's written
+        return None
+
+    campus_index = {campus.lower(): i for i, campus in enumerate(campuses)}
+    priority = None
+    named = []
+    for token in split_count(v.replace(",", " ").replace("/", " ")).split():
+        if token.isdecimal() and priority is None:
+            priority = int(token)
+        elif token in campus_index:
+            named.append(campus_index[token])
+        elif token != "or":
+            return "e"
+
+    if priority is None:
+        return "e"
+    preference = [-1] * len(campuses)
+    for campus in named or [0]:
+        preference[campus] = priority
+    return tuple(preference)
+
+def slot_bits(shifts):
+    """
+    Gives every timeslot a bit, for the per worker bitsets: (hour,day) : 1 << n.
+    A day's hours are consecutive bits, with a spare bit between days, so
+    the hour before any timeslot is one bit down, and never the last hour
+    of the day before.
+    """
+    if not shifts:
+        return dict()
+    first_hour = min(timeslot[0] for timeslot in shifts)
+    first_day = min(timeslot[1] for timeslot in shifts)
+    day_bits = max(timeslot[0] for timeslot in shifts) - first_hour + 2
+    return {timeslot: 1 << ((timeslot[1] - first_day) * day_bits + timeslot[0] - first_hour) for timeslot in shifts}
+
+def campus_count(shifts):
+    """
+    How many campuses a table of shifts covers.
+    """
+    for workers_needed in shifts.values():
+        return len(workers_needed)
+    return len(DEFAULT_CAMPUSES)
+
+class PotentialSchedule:
+
+    def __init__(self, wc, shifts, wsh = None, s = None, slot_hours = SLOT_HOURS):
+        self.worker_capacity = wc.copy() #person: (preferred, allotted, open), in timeslots
+        self.slot_hours = slot_hours     #hours each timeslot lasts, for the reports
+        
+        if wsh == None:
+            self.worker_slotted_hrs = dict.fromkeys(self.worker_capacity, 0) #person: n
+        else:
+            self.worker_slotted_hrs = wsh.copy()
+
+            
+        self.shifts = shifts.copy()
+
+
+        if s == None:
+            self.schedule = [dict() for campus in range(campus_count(self.shifts))] #campus : (hour,day) : [(person, preference)]
+        else:
+            self.schedule = [slots.copy() for slots in s]
+
+        self.slot_bit = slot_bits(self.shifts)
+        self.undo_log = None
+
+        self.reset_aggregates()
+
+    def reset_aggregates(self):
+        """
+        Recomputes the running totals that evaluate() is built from by walking
+        the whole schedule. Every later change to the schedule goes through
+        add_workers_to_slot or clear_slot, which keep these totals current.
+
+        Alongside the totals, the hours each worker works at each campus are
+        kept as a bitset (see slot_bits), so whether someone is working a
+        slot, or the hour either side of it, is a bit test.
+        """
+        self.gaps = 0
+        self.priority_accum = 0
+        self.priority_count = 0
+        self.trips_in = 0
+        self.hours_count = dict()         #n hours : number of workers with n hours
+        self.proportion_count = dict()    #hours / desired : number of workers
+        self.weighted_hours = dict()      #desired : hours among workers counted by mean_desired_weighted
+        self.weighted_count = 0
+        self.energy = None
+        self.hour_bits = [dict() for slots in self.schedule]  #campus : person : bitset of the hours they work there
+
+        for worker, hrs in self.worker_slotted_hrs.items():
+            self.count_hours(worker, hrs, 1)
+
+        for worker, prefs in self.worker_capacity.items():
+            if prefs[2]/prefs[0] > 2: #if you don't have many open hours, your desires aren't counted
+                self.weighted_count += 1
+
+        for campus in range(len(self.schedule)):
+            self.gaps += sum(workers_needed[campus] for workers_needed in self.shifts.values())
+            bits = self.hour_bits[campus]
+            for timeslot, workers in self.schedule[campus].items():
+                self.gaps -= len(workers)
+                self.count_priorities(workers, campus, 1)
+                self.trips_in += self.trips_into(timeslot, campus)
+                for worker in workers:
+                    bits[worker[0]] = bits.get(worker[0], 0) | self.slot_bit[timeslot]
+
+    def copy(self):
+        """
+        Returns an independent copy of this schedule, running totals included,
+        so the copy can be changed without rescoring it from scratch.
+        """
+        child = self.__class__.__new__(self.__class__)
+        child.worker_capacity = self.worker_capacity
+        child.slot_hours = self.slot_hours
+        child.shifts = self.shifts
+        child.worker_slotted_hrs = self.worker_slotted_hrs.copy()
+        child.schedule = [{timeslot: workers[:] for timeslot, workers in slots.items()} for slots in self.schedule]
+        child.slot_bit = self.slot_bit
+        child.hour_bits = [bits.copy() for bits in self.hour_bits]
+
+        child.gaps = self.gaps
+        child.priority_accum = self.priority_accum
+        child.priority_count = self.priority_count
+        child.trips_in = self.trips_in
+        child.hours_count = self.hours_count.copy()
+        child.proportion_count = self.proportion_count.copy()
+        child.weighted_hours = self.weighted_hours.copy()
+        child.weighted_count = self.weighted_count
+        child.energy = self.energy
+        child.undo_log = None
+        return child
+
+    def start_move(self):
+        """
+        Starts recording changes, so that everything up to the next
+        commit_move() or revert_move() can be rolled back in place.
+        """
+        self.undo_log = dict() #(campus, timeslot) : workers before the move
+        self.undo_totals = (self.gaps, self.priority_accum, self.priority_count, self.trips_in,
+                            self.hours_count.copy(), self.proportion_count.copy(), self.weighted_hours.copy(),
+                            self.energy)
+
+    def log_slot(self, timeslot, campus):
+        """
+        Remembers what a slot held before the current move first touched it.
+        """
+        if self.undo_log is not None and (campus, timeslot) not in self.undo_log:
+            self.undo_log[(campus, timeslot)] = self.slot_workers(timeslot, campus)
+
+    def commit_move(self):
+        """
+        Keeps the changes made since start_move().
+        """
+        self.undo_log = None
+
+    def revert_move(self):
+        """
+        Rolls back the changes made since start_move().
+        """
+        log = self.undo_log
+        self.undo_log = None
+        for (campus, timeslot), workers in log.items():
+            bit = self.slot_bit[timeslot]
+            bits = self.hour_bits[campus]
+            for worker in self.schedule[campus][timeslot]:
+                self.worker_slotted_hrs[worker[0]] -= 1
+                bits[worker[0]] &= ~bit
+            for worker in workers:
+                self.worker_slotted_hrs[worker[0]] += 1
+                bits[worker[0]] = bits.get(worker[0], 0) | bit
+            self.schedule[campus][timeslot] = workers
+
+        (self.gaps, self.priority_accum, self.priority_count, self.trips_in,
+         self.hours_count, self.proportion_count, self.weighted_hours,
+         self.energy) = self.undo_totals
+
+    def make_move(self, move):
+        """
+        Makes a move from ScheduleManager.propose_batch, left open like
+        reroll() leaves its changes: commit_move() or revert_move() next.
+        """
+        self.start_move()
+        for (timeslot, campus), workers in move.items():
+            self.clear_slot(timeslot, campus)
+            self.add_workers_to_slot(timeslot, campus, workers)
+
+    def score_moves(self, moves):
+        """
+        The energy each move from ScheduleManager.propose_batch would leave
+        this schedule with, made on its own. Here each is made and undone in
+        turn; DenseSchedule scores them all at once.
+        """
+        energies = []
+        for move in moves:
+            self.make_move(move)
+            energies.append(self.evaluate())
+            self.revert_move()
+        return energies
+
+    def slot_workers(self, timeslot, campus):
+        return list(self.schedule[campus].get(timeslot, []))
+
+    def works(self, worker_name, timeslot, campus):
+        """
+        Returns true if the worker is scheduled for this timeslot at this
+        campus. Timeslots outside the schedule are never worked.
+        """
+        return (self.hour_bits[campus].get(worker_name, 0) & self.slot_bit.get(timeslot, 0)) != 0
+
+    def is_working(self, worker_name, timeslot):
+        """
+        Returns true if the worker is scheduled for this timeslot at any
+        campus, ie. placing them in it anywhere would double book them.
+        """
+        bit = self.slot_bit.get(timeslot, 0)
+        return any(bits.get(worker_name, 0) & bit for bits in self.hour_bits)
+
+    def slotted_hours(self, worker_name):
+        return self.worker_slotted_hrs[worker_name]
+            
+    def desires_more_hours(self, worker):
+        """
+        Returns true if the scheduler has not yet filled this workers desired
+        hours.
+        """
+        current_hrs = self.worker_slotted_hrs[worker[0]]
+        desired_hrs = self.worker_capacity[worker[0]][0]
+        return current_hrs < desired_hrs
+
+
+    def allotted_more_hours(self, worker):
+        """
+        Returns true if the scheduler has not yet filled this workers allotted
+        hours.
+        """
+        current_hrs = self.worker_slotted_hrs[worker[0]]
+        allotted_hrs = self.worker_capacity[worker[0]][1]
+        return current_hrs < allotted_hrs
+
+    def add_workers_to_slot(self, timeslot, campus, workers):
+        """
+        Places workers into the schedule, and updates workers' hour counts.
+        """
+        self.log_slot(timeslot, campus)
+        bit = self.slot_bit[timeslot]
+        bits = self.hour_bits[campus]
+
+        for worker in workers:
+            self.change_hours(worker[0], 1)
+            self.trips_in += self.trips_made(worker, timeslot, campus)
+            bits[worker[0]] = bits.get(worker[0], 0) | bit
+
+        current_workers = self.schedule[campus].setdefault(timeslot, [])
+        current_workers.extend(workers)
+
+        self.gaps -= len(workers)
+        self.count_priorities(workers, campus, 1)
+        self.energy = None
+
+    def clear_slot(self, timeslot, campus):
+        """
+        Empties a slot in the schedule, updates workers' hour counts, and
+        returns the workers that were removed.
+        """
+        self.log_slot(timeslot, campus)
+        bit = self.slot_bit[timeslot]
+        bits = self.hour_bits[campus]
+
+        removed = self.schedule[campus].get(timeslot, [])
+        for worker in removed:
+            self.change_hours(worker[0], -1)
+            bits[worker[0]] &= ~bit
+            self.trips_in -= self.trips_made(worker, timeslot, campus)
+
+        self.schedule[campus][timeslot] = []
+
+        self.gaps += len(removed)
+        self.count_priorities(removed, campus, -1)
+        self.energy = None
+        return removed
+
+    def change_hours(self, worker, delta):
+        """
+        Moves a worker's slotted hours by delta, keeping the hour totals current.
+        """
+        hrs = self.worker_slotted_hrs[worker]
+        self.count_hours(worker, hrs, -1)
+        self.worker_slotted_hrs[worker] = hrs + delta
+        self.count_hours(worker, hrs + delta, 1)
+
+    def count_hours(self, worker, hrs, sign):
+        """
+        Adds (sign 1) or removes (sign -1) one worker's hours from the totals
+        behind min_hrs_filled, min_hrs_proportion and mean_desired_weighted.
+        """
+        prefs = self.worker_capacity[worker]
+
+        n = self.hours_count.get(hrs, 0) + sign
+        if n:
+            self.hours_count[hrs] = n
+        else:
+            del self.hours_count[hrs]
+
+        proportion = hrs / prefs[0]
+        n = self.proportion_count.get(proportion, 0) + sign
+        if n:
+            self.proportion_count[proportion] = n
+        else:
+            del self.proportion_count[proportion]
+
+        if prefs[2]/prefs[0] > 2:
+            self.weighted_hours[prefs[0]] = self.weighted_hours.get(prefs[0], 0) + sign * hrs
+
+    def count_priorities(self, workers, campus, sign):
+        for person in workers:
+            if person[1][campus] == 1:
+                self.priority_accum += 2 * sign
+            elif person[1][campus] == 2:
+                self.priority_accum += sign
+            self.priority_count += sign
+
+    def trips_into(self, timeslot, campus):
+        """
+        Counts the workers in a slot who were not in the same campus' slot the
+        hour before, ie. who had to make a trip in to work it.
+        """
+        previous = self.schedule[campus].get((timeslot[0]-1,timeslot[1]), [])
+        return len([worker for worker in self.schedule[campus].get(timeslot, []) if worker not in previous])
+
+    def trips_made(self, worker, timeslot, campus):
+        """
+        The trips in that placing a worker in a slot they're not in adds: one
+        for them, unless they stay on from the hour before, less the one
+        they'd have made into the hour after, if they're on then. Only
+        checks the hours either side when their bits say they're working.
+        """
+        bits = self.hour_bits[campus].get(worker[0], 0)
+        bit = self.slot_bit[timeslot]
+        trips = 1
+        if bits & (bit >> 1) and worker in self.schedule[campus][(timeslot[0]-1,timeslot[1])]:
+            trips -= 1
+        if bits & (bit << 1) and worker in self.schedule[campus][(timeslot[0]+1,timeslot[1])]:
+            trips -= 1
+        return trips
+
+    def count_gaps(self):
+        """
+        Counts the shifts, over the whole schedule, that nobody is filling.
+        """
+        return self.gaps
+
+    def count_under_desired(self):
+        """
+        Counts the workers scheduled for fewer hours than they desire.
+        """
+        return sum(n for proportion, n in self.proportion_count.items() if proportion < 1)
+
+    def geometric_mean_desired(self):
+        
+        accum = 1
+        count = 0
+        for worker, prefs in self.worker_capacity.items():
+            count += 1
+
+            proportion = self.worker_slotted_hrs[worker] / prefs[0]
+
+
+            # no bonus points for working more than you want to.
+            # going past is just as bad as going below.
+            regulated = 1 - abs(proportion - 1)
+            
+            accum*= proportion
+
+        return pow(accum, 1/count)
+
+    def mean_desired_weighted(self):
+        if not self.weighted_count: #nobody has enough open hours to be counted
+            return 0
+        accum = sum(hrs / desired for desired, hrs in self.weighted_hours.items())
+        return accum / self.weighted_count
+
+    def avg_priority(self):
+        if not self.priority_count: #nobody is scheduled yet
+            return 0
+        return self.priority_accum / self.priority_count
+
+    def min_hrs_filled(self):
+        return min(self.hours_count)
+
+    def min_hrs_proportion(self):
+        return min(self.proportion_count)
+
+    def avg_trips_in(self):
+        return self.trips_in / len(self.worker_capacity)
+
+    def total_hours(self):
+        return self.priority_count
+
+
+    def report_scores(self):
+        out = ""
+        out += f" Avg Priority: {self.avg_priority():.2f}\n"
+        out += f" Total hours filled: {self.total_hours() * self.slot_hours}\n"
+        out += f" Min hrs filled: {self.min_hrs_filled() * self.slot_hours}\n"
+        out += f" Min hrs proportion: {self.min_hrs_proportion()}\n"
+        out += f" Mean desired (weighted) filled: {self.mean_desired_weighted():.2f}\n"
+        out += f" Mean trips in: {self.avg_trips_in():.2f}\n"
+        out += f" Geom mean desired: {self.geometric_mean_desired():.2f}\n"
+        out += f" Gaps in schedule: {self.count_gaps():.2f}\n"
+        out += f" Score: {-self.evaluate():.2f}\n\n"
+        return out
+
+    def report_workers(self):
+
+        workers = list(self.worker_capacity.keys())
+        
+        proportion = lambda worker: self.worker_slotted_hrs[worker]/self.worker_capacity[worker][0]
+        
+        workers.sort(key = proportion, reverse = True)
+
+        out = ""
+        for worker in workers:
+            prefs = [slots * self.slot_hours for slots in self.worker_capacity[worker]]#person: (preferred, allotted, open), in hours
+            scheduled = self.worker_slotted_hrs[worker] * self.slot_hours
+            out += f"{worker} \n- Desired: {prefs[0]:>2} Scheduled: {scheduled:>2} Proportion: {proportion(worker):>4.2f} Open: {prefs[2]}\n"
+            
+        return out
+
+    def report(self):
+        print(self.report_scores())
+        print(self.report_workers())
+
+    def write_report(self, fn = REPORT_FILENAME):
+        report = open(fn, "w")
+        report.write(self.report_scores())
+        report.write(self.report_workers())
+        report.close()
+        
+        
+
+    def evaluate(self):
+        """
+        Scores the schedule; lower is better. The score is built from the
+        running totals and cached until the schedule next changes, so a
+        successor only pays for the slots that were rerolled.
+        """
+        if self.energy is not None:
+            return self.energy
+
+        score = 0
+
+        score += self.count_gaps() * -1000
+
+        score += self.min_hrs_filled() * 100
+
+        score += self.min_hrs_proportion() ** 2 * 100
+
+        score += self.total_hours()
+
+
+
+        score /= self.avg_trips_in() or 1     #[1,12+); nobody coming in at all counts as 1
+
+        score *= self.avg_priority() ** 2 + 1   #[0,2]
+
+        score *= self.mean_desired_weighted() + 1 
+
+        self.energy = -score
+        return self.energy
+            
+        
+        
+if __name__ == "__main__":
+    sm = ScheduleManager()
+    sm.initialize()        
+    sm.load_msc_schedule()
+    sm.import_worker_schedules()
+    ps = sm.create_default_schedule()
+    ps.report()
+
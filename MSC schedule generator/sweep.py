@@ -0,0 +1,150 @@
+"""
+Hyperparameter sweeps over the annealer's starting temperature and cooling
+rate, spread over a process pool.
+
+Every finished run is appended to a results file straight away (JSON lines,
+or CSV if the file name ends in .csv), so an interrupted sweep keeps what it
+finished, and rerunning it with the same file only runs what is missing.
+"""
+import os, json, csv, random, itertools as it
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import annealing
+from annealing import share_manager, anneal
+
+
+
+SWEEP_TEMPS = [x*x * 1000 for x in range(1,11)]
+SWEEP_COOLING_RATES = [0.001, 0.005,0.01,0.02]
+SWEEP_ITERATIONS = 10
+SWEEP_RESULTS_FILENAME = 'sweep results.jsonl'
+
+RESULT_FIELDS = ["init_temp", "cooling_rate", "iteration", "seed", "best_energy", "runtime", "evaluations", "evals_per_sec"]
+
+
+def run_key(init_temp, cooling_rate, iteration):
+    return (float(init_temp), float(cooling_rate), int(iteration))
+
+def run_seed(base_seed, init_temp, cooling_rate, iteration):
+    """
+    The seed for one run of the sweep. It only depends on the run itself, so a
+    resumed sweep reruns exactly what the interrupted one would have.
+    """
+    return random.Random(f"{base_seed}:{init_temp}:{cooling_rate}:{iteration}").randrange(2**32)
+
+def run_sweep_job(init_temp, cooling_rate, iteration, seed):
+    """
+    Anneals once in a worker process, headless, and returns the result record.
+    """
+    best_schedule, best_energy, t_diff, evaluations = anneal(annealing.shared_manager, init_temp, cooling_rate,
+                                                             show_plots = False, verbose = False, seed = seed)
+    return {
+        "init_temp": init_temp,
+        "cooling_rate": cooling_rate,
+        "iteration": iteration,
+        "seed": seed,
+        "best_energy": best_energy,
+        "runtime": t_diff,
+        "evaluations": evaluations,
+        "evals_per_sec": evaluations / t_diff if t_diff else 0.0,
+    }
+
+def load_results(fn):
+    """
+    Reads the records already in a results file. A line cut off by an
+    interrupted write is skipped, so that run is simply redone.
+    """
+    if not os.path.exists(fn):
+        return []
+
+    records = []
+    with open(fn, newline = "") as f:
+        if fn.endswith(".csv"):
+            lines = csv.DictReader(f)
+        else:
+            lines = f
+        for line in lines:
+            try:
+                record = line if isinstance(line, dict) else json.loads(line)
+                record["init_temp"], record["cooling_rate"], record["iteration"] = run_key(record["init_temp"], record["cooling_rate"], record["iteration"])
+                record["best_energy"] = float(record["best_energy"])
+                record["runtime"] = float(record["runtime"])
+            except (ValueError, KeyError, TypeError):
+                continue
+            records.append(record)
+    return records
+
+def open_results(fn):
+    """
+    Opens the results file to append to, returning (file, write function).
+    """
+    new_file = not os.path.exists(fn) or os.path.getsize(fn) == 0
+
+    f = open(fn, "a", newline = "")
+    if not new_file:
+        with open(fn, "rb") as existing:
+            existing.seek(-1, os.SEEK_END)
+            if existing.read(1) != b"\n": #finish off a cut off line so the next record starts clean
+                f.write("\n")
+
+    if fn.endswith(".csv"):
+        writer = csv.DictWriter(f, fieldnames = RESULT_FIELDS)
+        if new_file:
+            writer.writeheader()
+        write = writer.writerow
+    else:
+        write = lambda record: f.write(json.dumps(record) + "\n")
+
+    return f, write
+
+def run_sweep(sm, fn = SWEEP_RESULTS_FILENAME, temps = SWEEP_TEMPS, cooling_rates = SWEEP_COOLING_RATES,
+              iterations = SWEEP_ITERATIONS, base_seed = 0, max_workers = None):
+    """
+    Anneals iterations times for every (temperature, cooling rate) pair across
+    a process pool, streaming each result to fn as it finishes. Runs already
+    recorded in fn are skipped. Returns every record in fn.
+    """
+    records = load_results(fn)
+    done = {run_key(x["init_temp"], x["cooling_rate"], x["iteration"]) for x in records}
+
+    jobs = [(init_temp, cooling_rate, i) for init_temp, cooling_rate in it.product(temps, cooling_rates) for i in range(iterations)
+            if run_key(init_temp, cooling_rate, i) not in done]
+
+    print(f"Sweeping {len(temps)*len(cooling_rates)} experiments for {iterations} iterations each: "
+          f"{len(jobs)} runs to go, {len(records)} already in '{fn}'.")
+
+    f, write = open_results(fn)
+    try:
+        with ProcessPoolExecutor(max_workers = max_workers, initializer = share_manager, initargs = (sm,)) as pool:
+            futures = [pool.submit(run_sweep_job, *job, run_seed(base_seed, *job)) for job in jobs]
+            for n, future in enumerate(as_completed(futures), 1):
+                record = future.result()
+                write(record)
+                f.flush()
+                records.append(record)
+                print(f"[{n}/{len(jobs)}] T: {record['init_temp']} \t CR: {record['cooling_rate']} \t "
+                      f"Score: {-record['best_energy']:.2f} \t Run Time: {record['runtime']:.4f}")
+    finally:
+        f.close()
+
+    return records
+
+def summarize(records):
+    """
+    Prints the mean run time of every (temperature, cooling rate) pair and the
+    parameters behind the best score.
+    """
+    if not records:
+        return
+
+    grouped = dict()
+    for record in records:
+        grouped.setdefault((record["init_temp"], record["cooling_rate"]), []).append(record)
+
+    for (init_temp, cooling_rate), group in sorted(grouped.items()):
+        mean_time = sum(x["runtime"] for x in group) / len(group)
+        print(f"T: {init_temp} \t CR: {cooling_rate} \t Mean Run Time: {mean_time:.4f}")
+
+    best = min(records, key = lambda x: x["best_energy"])
+    print("FINAL REPORT:")
+    print(f"Params yielding the best score: {(best['init_temp'], best['cooling_rate'])}")
+    print(f"Best score: {-best['best_energy']:.2f}")
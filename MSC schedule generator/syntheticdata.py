@@ -0,0 +1,116 @@
+"""
+Generates synthetic, but realistic, input folders for load testing: an hours
+of operation workbook and any number of tutor availability forms, filled in
+the same cells the real ones are.
+
+The forms and workbook are copied from the blank templates, the same way
+transferdata.py makes its copies, so the layout always matches what the
+parser expects. Demand is scaled up or down from the template's hours of
+operation to fit the number of tutors, and every tutor's availability is
+drawn from roughly the mix of entries found on real forms.
+"""
+import os, shutil, random
+import openpyxl as op
+from schedulemanager import *
+
+
+
+AVAILABILITY_FORM_FILENAME = 'Tutor Availability Form.xlsx'
+
+SAMPLE_TUTORS = 18 #how many tutors the template's hours of operation are staffed for
+
+# entries on real forms, for the hours a tutor is available, and how often they come up
+AVAILABLE_ENTRIES = [0, 1, 2, "0 csb or sju", "1 SJU", "2 CSB or SJU", "2 SJU", "1 CSB or SJU", "1 CSB", "2 CSB"]
+AVAILABLE_WEIGHTS = [261, 81, 77, 25, 25, 15, 15, 14, 5, 4]
+
+WORK_AWARDS = [2, 4, 6, 6, 6, 6, 6, 8, 9, 12, 12]
+
+
+def demand_cell(workers_needed, campuses):
+    """
+    Writes the workers needed at each campus the way the hours of operation
+    workbook spells them out, eg. "1 CSB, 1 SJU".
+    """
+    return ", ".join(f"{n} {campus}" for n, campus in zip(workers_needed, campuses) if n) or 0
+
+def write_hours_of_operation(fn, template_fn, n_tutors, rng):
+    """
+    Copies the hours of operation template to fn, scaling the workers needed
+    in every open hour to n_tutors. Hours the template has closed stay
+    closed.
+    """
+    shutil.copy(template_fn, fn)
+    grid, campuses, shifts, slot_hours = ScheduleManager(use_cache = False).read_shifts(template_fn)
+    factor = n_tutors / SAMPLE_TUTORS
+
+    wb = op.open(fn)
+    ws = wb.active
+    for (hour, day), workers_needed in shifts.items():
+        # round up or down at random, so the totals come out right on average
+        scaled = [int(n * factor + rng.random()) if n else 0 for n in workers_needed]
+        ws.cell(hour, day).value = demand_cell(scaled, campuses)
+    wb.save(fn)
+    wb.close()
+
+def write_availability_form(fn, template_fn, worker_name, rng):
+    """
+    Copies the availability form template to fn and fills it in for one
+    made up tutor. Hours the template has closed ('-') stay closed.
+    """
+    shutil.copy(template_fn, fn)
+
+    award = rng.choice(WORK_AWARDS)
+    desired = max(1, award - rng.choice([0, 0, 0, 1, 2]))
+    unavailable = rng.uniform(0.3, 0.7) #share of the open hours this tutor can't make
+
+    wb = op.open(fn)
+    ws = wb.active
+    ws.cell(TUTOR_NAME_CELL[0],TUTOR_NAME_CELL[1]).value = worker_name
+    ws.cell(TUTOR_WORK_AWARD_CELL[0],TUTOR_WORK_AWARD_CELL[1]).value = award
+    ws.cell(TUTOR_DESIRED_HOURS_CELL[0],TUTOR_DESIRED_HOURS_CELL[1]).value = desired
+
+    first_row, last_row, first_column, last_column = find_time_grid(ws)
+    for hour in range(first_row, last_row + 1):
+        for day in range(first_column, last_column + 1):
+            cell = ws.cell(hour,day)
+            if cell.value == "-":
+                continue
+            if rng.random() < unavailable:
+                cell.value = "x"
+            else:
+                cell.value = rng.choices(AVAILABLE_ENTRIES, AVAILABLE_WEIGHTS)[0]
+
+    wb.save(fn)
+    wb.close()
+
+def generate_workload(directory, n_tutors, seed = None, template_directory = "."):
+    """
+    Sets up directory as a complete input folder for n_tutors made up tutors,
+    ready for ScheduleManager(directory). The templates, including the
+    constraints and schedule workbooks the results are written into, are
+    copied from template_directory. The same seed always makes the same
+    folder.
+    """
+    rng = random.Random(seed)
+    template = lambda fn: os.path.join(template_directory, fn)
+
+    os.makedirs(os.path.join(directory, AVAILABILITY_FOLDER_NAME), exist_ok = True)
+
+    for fn in (MSC_CONSTRAINTS_FILENAME, MSC_TUTOR_SCHEDULE_FILENAME):
+        shutil.copy(template(fn), os.path.join(directory, fn))
+
+    write_hours_of_operation(os.path.join(directory, MSC_WORKERS_NEEDED_FILENAME), template(MSC_WORKERS_NEEDED_FILENAME), n_tutors, rng)
+
+    for i in range(n_tutors):
+        fn = os.path.join(directory, AVAILABILITY_FOLDER_NAME, f"synthetic ({i+1}).xlsx")
+        write_availability_form(fn, template(AVAILABILITY_FORM_FILENAME), f"TUTOR{i+1:04}", rng)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description = "Generates a synthetic input folder of tutor availability forms, for load testing.")
+    parser.add_argument("directory", help = "folder to generate into")
+    parser.add_argument("tutors", type = int, help = "how many tutors to make up")
+    parser.add_argument("--seed", type = int, help = "random seed; the same seed makes the same folder")
+    args = parser.parse_args()
+    generate_workload(args.directory, args.tutors, args.seed)
@@ -0,0 +1,120 @@
+"""
+Tabu search over PotentialSchedules.
+
+Each step tries a batch of candidate moves from a moves.MoveSet, scoring
+and undoing each in turn, then makes the best of them. Every (worker, slot)
+pair the move adds or takes away becomes tabu for a while: moves that would
+touch a tabu pair again are passed over, unless they would beat the best
+schedule found so far (aspiration). That keeps the search from undoing its
+own recent work and circling back to schedules it has already been through.
+
+Since it always takes the best move it sees, runs vary far less with the
+seed than annealing does.
+"""
+import time, random
+from moves import MoveSet, set_slot
+from annealing import NUM_CHANGES
+from denseschedule import DenseProblem
+
+
+
+TABU_ITERATIONS = 500
+TABU_BATCH = 20     #candidate moves scored per step
+TABU_TENURE = 15    #steps a changed (worker, slot) pair stays tabu
+
+
+def candidate_move(sm, ps, moves, rng):
+    """
+    Makes a move on ps, scores it, and undoes it. Returns its energy, what
+    the slots it changed held afterwards, (campus, timeslot) : workers, and
+    the (worker, timeslot, campus) pairs it added or took away.
+    """
+    moves.propose(sm, ps, NUM_CHANGES, rng)
+    energy = ps.evaluate()
+
+    after = dict()
+    changed = set()
+    for (campus, timeslot), before in ps.undo_log.items():
+        workers = ps.slot_workers(timeslot, campus)
+        after[(campus, timeslot)] = workers
+        changed |= {(worker[0], timeslot, campus) for worker in set(before) ^ set(workers)}
+
+    ps.revert_move()
+    return energy, after, changed
+
+def tabu_search(sm, iterations = TABU_ITERATIONS, batch_size = TABU_BATCH, tenure = TABU_TENURE, dense = False,
+                time_budget = None, stagnation = None, moves = None, seed = None, rng = None, verbose = True):
+    """
+    Runs tabu search from the default schedule for a number of steps, or
+    until time_budget seconds have passed, or until stagnation steps in a
+    row haven't found a new best. Every random choice is drawn from rng, a
+    random.Random, made from seed if not given, so a seed makes the run
+    repeatable.
+
+    Returns the same as main(): best schedule, best energy, and time taken.
+    """
+    if rng is None:
+        rng = random.Random(seed)
+    if moves is None:
+        moves = MoveSet()
+
+    start_time = time.perf_counter()
+
+    ps = sm.create_default_schedule(rng)
+    if dense: #score on the numpy engine instead, for big rosters
+        ps = DenseProblem(sm).from_potential(ps)
+
+    best_schedule = ps.copy()
+    best_energy = ps.evaluate()
+
+    tabu = dict() #(worker, timeslot, campus) : step it stops being tabu
+    steps_since_best = 0
+    evaluations = 0
+
+    if verbose:
+        print("Starting tabu search.")
+
+    for step in range(iterations):
+        if time_budget is not None and time.perf_counter() - start_time > time_budget:
+            break
+        if stagnation is not None and steps_since_best >= stagnation:
+            break
+
+        chosen = None
+        for i in range(batch_size):
+            energy, after, changed = candidate_move(sm, ps, moves, rng)
+            evaluations += 1
+            if not changed:
+                continue
+            if energy >= best_energy and any(tabu.get(pair, -1) > step for pair in changed):
+                continue
+            if chosen is None or energy < chosen[0]:
+                chosen = (energy, after, changed)
+
+        if chosen is None:
+            steps_since_best += 1
+            continue
+
+        energy, after, changed = chosen
+        ps.start_move()
+        for (campus, timeslot), workers in after.items():
+            set_slot(ps, timeslot, campus, workers)
+        ps.commit_move()
+        for pair in changed:
+            tabu[pair] = step + tenure
+
+        if energy < best_energy:
+            best_schedule = ps.copy()
+            best_energy = energy
+            steps_since_best = 0
+        else:
+            steps_since_best += 1
+
+    t_diff = time.perf_counter() - start_time
+
+    if verbose:
+        print("Tabu search completed.")
+        print(f"Took {t_diff} seconds, scoring {evaluations} candidate moves.")
+        print(f"Best score was {-best_energy:.2f} points.")
+
+    return best_schedule, best_energy, t_diff
@@ -0,0 +1,161 @@
+"""
+Counters and timers for the annealing loop, and opt-in profiling.
+
+Every Annealer keeps a RunStats: where the time of each step went, how many
+moves were accepted at each band of temperatures and of each type, and every
+time a new best was found. Reading the clock a few times a step costs next to nothing next
+to a step itself, so it's always on. The stats can be written out as JSON at
+the end of a run, and streamed to a JSON lines file while it goes.
+
+capture() is heavier, so it's only for when asked: it runs a block under
+cProfile and/or tracemalloc and saves what they found.
+"""
+import time, math, json, contextlib
+
+
+
+STREAM_INTERVAL = 5 #seconds between streamed snapshots
+TRACEMALLOC_TOP = 25 #how many of the biggest allocation sites to save
+
+
+def temperature_band(temp):
+    """
+    The band a temperature falls in: its order of magnitude, so 10 up to 100
+    is band 1, 100 up to 1000 band 2, and so on.
+    """
+    return math.floor(math.log10(temp))
+
+class RunStats:
+
+    def __init__(self, stream_fn = None, stream_interval = STREAM_INTERVAL):
+        """
+        With stream_fn, a snapshot of the stats is appended to that file as a
+        line of JSON every stream_interval seconds.
+        """
+        self.timers = dict.fromkeys(("successor", "evaluate", "acceptance", "bookkeeping"), 0.0) #seconds spent in each part of a step
+        self.steps = 0
+        self.evaluations = 0        #schedules scored: one a step, or a whole batch of candidates
+        self.accepted = 0
+        self.bands = dict()         #temperature band : [moves, accepted]
+        self.moves = dict()         #type of move : [moves, accepted]
+        self.improvements = []      #(step, seconds in, temperature, score) every time a new best is found
+
+        self.stream_fn = stream_fn
+        self.stream_interval = stream_interval
+        self.start_time = time.perf_counter()
+        self.last_stream = self.start_time
+
+    def start(self):
+        self.start_time = time.perf_counter()
+        self.last_stream = self.start_time
+
+    def record_step(self, temp, accepted, successor_time, evaluate_time, acceptance_time, bookkeeping_time, move = "reroll", evaluations = 1):
+        timers = self.timers
+        timers["successor"] += successor_time
+        timers["evaluate"] += evaluate_time
+        timers["acceptance"] += acceptance_time
+        timers["bookkeeping"] += bookkeeping_time
+
+        self.steps += 1
+        self.evaluations += evaluations
+
+        band = self.bands.setdefault(temperature_band(temp), [0, 0])
+        kind = self.moves.setdefault(move, [0, 0])
+        band[0] += 1
+        kind[0] += 1
+        if accepted:
+            self.accepted += 1
+            band[1] += 1
+            kind[1] += 1
+
+        if self.stream_fn is not None and time.perf_counter() - self.last_stream >= self.stream_interval:
+            self.stream()
+
+    def record_improvement(self, temp, energy):
+        self.improvements.append((self.steps, time.perf_counter() - self.start_time, temp, -energy))
+
+    def elapsed(self):
+        return time.perf_counter() - self.start_time
+
+    def summary(self):
+        """
+        Returns the stats as a dict, ready for JSON.
+        """
+        elapsed = self.elapsed()
+        return {
+            "seconds": elapsed,
+            "steps": self.steps,
+            "evaluations": self.evaluations,
+            "evaluations_per_sec": self.evaluations / elapsed if elapsed else 0.0,
+            "acceptance_rate": self.accepted / self.steps if self.steps else 0.0,
+            "timers": dict(self.timers),
+            "acceptance_by_band": [{"min_temp": 10 ** band, "max_temp": 10 ** (band + 1), "moves": moves,
+                                    "accepted": accepted, "acceptance_rate": accepted / moves}
+                                   for band, (moves, accepted) in sorted(self.bands.items(), reverse = True)],
+            "acceptance_by_move": {move: {"moves": moves, "accepted": accepted, "acceptance_rate": accepted / moves}
+                                   for move, (moves, accepted) in self.moves.items()},
+            "improvements": [{"step": step, "seconds": seconds, "temp": temp, "score": score}
+                             for step, seconds, temp, score in self.improvements],
+        }
+
+    def stream(self):
+        """
+        Appends a snapshot of the stats so far to the stream file, leaving out
+        the improvement list to keep the lines short.
+        """
+        self.last_stream = time.perf_counter()
+        snapshot = self.summary()
+        snapshot["improvements"] = len(self.improvements)
+        snapshot["best_score"] = self.improvements[-1][3] if self.improvements else None
+        with open(self.stream_fn, "a") as f:
+            f.write(json.dumps(snapshot) + "\n")
+
+    def write_json(self, fn):
+        with open(fn, "w") as f:
+            json.dump(self.summary(), f, indent = 2)
+
+    def report(self):
+        """
+        A line or two on where the time went, for the console.
+        """
+        total = sum(self.timers.values()) or 1
+        shares = ", ".join(f"{name} {seconds / total:.0%}" for name, seconds in self.timers.items())
+        summary = self.summary()
+        return (f"{summary['evaluations_per_sec']:.0f} evaluations/sec, {summary['acceptance_rate']:.1%} of moves accepted, "
+                f"{len(self.improvements)} improvements.\nTime per step went to: {shares}.")
+
+
+@contextlib.contextmanager
+def capture(profile_fn = None, memory_fn = None):
+    """
+    Runs the block under cProfile if profile_fn is given, saving the stats
+    there (open them with pstats or snakeviz), and under tracemalloc if
+    memory_fn is given, saving the peak and the biggest allocation sites
+    there as text. With neither, it does nothing.
+    """
+    profiler = None
+    if profile_fn is not None:
+        import cProfile
+        profiler = cProfile.Profile()
+    if memory_fn is not None:
+        import tracemalloc
+        tracemalloc.start()
+
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(profile_fn)
+
+        if memory_fn is not None:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            with open(memory_fn, "w") as f:
+                f.write(f"Peak traced memory: {peak / 2**20:.2f} MB\n")
+                f.write(f"Still allocated at the end: {current / 2**20:.2f} MB\n\n")
+                for stat in snapshot.statistics("lineno")[:TRACEMALLOC_TOP]:
+                    f.write(f"{stat}\n")
@@ -0,0 +1,121 @@
+"""
+Parallel tempering (replica exchange) over PotentialSchedules.
+
+A ladder of replicas each anneal at a fixed temperature in their own worker
+process. Between rounds, neighbouring replicas try to swap schedules, so good
+schedules found by the hot, exploring replicas can sink down to the cold ones
+to be refined, and cold replicas stuck in a local optimum can be shaken loose.
+"""
+import os, time, math, random
+from concurrent.futures import ProcessPoolExecutor
+import annealing
+from annealing import share_manager, acceptanceProb, NUM_CHANGES
+
+
+
+REPLICAS = 8 #rungs on the temperature ladder, however many cores there are to run them on
+
+
+def temperature_ladder(n_replicas, t_min = 1, t_max = 10000):
+    """
+    Spaces n_replicas temperatures geometrically from t_min to t_max.
+    """
+    if n_replicas == 1:
+        return [t_min]
+    return [t_min * (t_max / t_min) ** (i / (n_replicas - 1)) for i in range(n_replicas)]
+
+def run_replica(ps, temp, steps, seed, best_energy):
+    """
+    Runs one replica for a number of Metropolis steps at a fixed temperature,
+    in a worker process. A replica without a schedule yet starts from the
+    default one.
+
+    Returns the replica's schedule and energy, and its best schedule of the
+    round if it beat best_energy (otherwise None).
+    """
+    rng = random.Random(seed)
+    sm = annealing.shared_manager
+
+    if ps is None:
+        ps = sm.create_default_schedule(rng)
+
+    energy = ps.evaluate()
+    best_schedule = None
+    if energy < best_energy:
+        best_schedule = ps.copy()
+        best_energy = energy
+
+    for i in range(steps):
+        sm.reroll(ps, NUM_CHANGES, rng)
+        new_energy = ps.evaluate()
+
+        if new_energy < best_energy:
+            best_schedule = ps.copy()
+            best_energy = new_energy
+
+        if acceptanceProb(energy, new_energy, temp) > rng.random():
+            ps.commit_move()
+            energy = new_energy
+        else:
+            ps.revert_move()
+
+    return ps, energy, best_schedule, best_energy
+
+def parallel_tempering(sm, n_replicas = REPLICAS, t_min = 1, t_max = 10000, steps_per_swap = 50, rounds = 40, time_budget = None, seed = None):
+    """
+    Runs replica exchange over a ladder of n_replicas temperatures between
+    t_min and t_max. Each round, every replica takes steps_per_swap steps, in
+    parallel across as many cores as there are, then neighbours try to swap. Stops after the given number of
+    rounds, or once time_budget seconds have passed.
+
+    Returns the same as main(): best schedule, best energy, and time taken.
+    """
+    rng = random.Random(seed)
+    temps = temperature_ladder(n_replicas, t_min, t_max)
+
+    states = [None] * n_replicas
+    energies = [None] * n_replicas
+
+    best_schedule = None
+    best_energy = float("inf")
+
+    swaps_tried = 0
+    swaps_made = 0
+
+    print(f"Starting parallel tempering with {n_replicas} replicas on {min(n_replicas, os.cpu_count())} cores.")
+    start_time = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers = min(n_replicas, os.cpu_count()), initializer = share_manager, initargs = (sm,)) as pool:
+        for round_number in range(rounds):
+            seeds = [rng.randrange(2**32) for i in range(n_replicas)]
+            results = list(pool.map(run_replica, states, temps, [steps_per_swap] * n_replicas, seeds, [best_energy] * n_replicas))
+
+            for i, (ps, energy, replica_best, replica_best_energy) in enumerate(results):
+                states[i] = ps
+                energies[i] = energy
+                if replica_best is not None and replica_best_energy < best_energy:
+                    best_schedule = replica_best
+                    best_energy = replica_best_energy
+
+            # alternate between swapping the even and the odd neighbour pairs
+            for i in range(round_number % 2, n_replicas - 1, 2):
+                swaps_tried += 1
+                exponent = (1 / temps[i] - 1 / temps[i+1]) * (energies[i] - energies[i+1])
+                if exponent >= 0 or math.exp(exponent) > rng.random():
+                    states[i], states[i+1] = states[i+1], states[i]
+                    energies[i], energies[i+1] = energies[i+1], energies[i]
+                    swaps_made += 1
+
+            if time_budget is not None and time.perf_counter() - start_time > time_budget:
+                break
+
+    end_time = time.perf_counter()
+    t_diff = end_time - start_time
+
+    print("Parallel tempering completed.")
+    print(f"Took {t_diff} seconds.")
+    if swaps_tried:
+        print(f"Accepted {swaps_made} of {swaps_tried} replica swaps.")
+    print(f"Best score was {-best_energy:.2f} points.")
+
+    return best_schedule, best_energy, t_diff
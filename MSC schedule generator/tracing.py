@@ -0,0 +1,187 @@
+"""
+Bounded recording of an annealing run's trace: the temperature, current
+energy and best energy as the steps go by, for graphing.
+
+A TraceRecorder keeps its rows in a preallocated array of doubles. It records
+every k-th step, or only the steps that found a new best, and once its
+buffers fill up it drops every other row and starts recording half as
+often, so a run of any length takes the same memory. The rows can also be
+streamed to a CSV file as they're recorded, and saved at the end.
+
+Graphs are drawn from saved traces, afterwards, so several runs, eg. the
+chains of a multistart, can go on one graph to compare them:
+
+    python tracing.py run.csv "chain 1.csv" "chain 2.csv" --out traces.png
+"""
+import csv, argparse
+from array import array
+
+
+
+TRACE_CAPACITY = 20000      #rows kept in memory before the trace is thinned
+STREAM_BATCH = 1000         #rows held back before they're appended to the stream file
+TRACE_FIELDS = ["step", "temp", "energy", "best"]
+
+
+class TraceRecorder:
+
+    def __init__(self, every = 1, improvements_only = False, capacity = TRACE_CAPACITY, stream_fn = None):
+        """
+        Records every k-th step, or with improvements_only, only the steps
+        that found a new best. With stream_fn, every row recorded is also
+        appended to that CSV file, where it stays when the buffers are
+        thinned.
+        """
+        self.every = every
+        self.improvements_only = improvements_only
+        self.capacity = capacity
+        self.rows = array("d", bytes(8 * capacity * len(TRACE_FIELDS))) #row after row, TRACE_FIELDS each
+        self.size = 0
+        self.last_step = -1
+        self.last_best = float("inf")
+
+        self.stream_fn = stream_fn
+        self.pending = []   #rows not streamed yet
+        if stream_fn is not None:
+            with open(stream_fn, "w", newline = "") as f:
+                csv.writer(f).writerow(TRACE_FIELDS)
+
+    def record(self, step, temp, energy, best):
+        self.last_step = step
+        improved = best < self.last_best
+        self.last_best = min(best, self.last_best)
+        if self.improvements_only:
+            if not improved:
+                return
+        elif step % self.every:
+            return
+
+        if self.size == self.capacity:
+            self.thin()
+        i = self.size * len(TRACE_FIELDS)
+        rows = self.rows
+        rows[i] = step
+        rows[i + 1] = temp
+        rows[i + 2] = energy
+        rows[i + 3] = best
+        self.size += 1
+
+        if self.stream_fn is not None:
+            self.pending.append((step, temp, energy, best))
+            if len(self.pending) >= STREAM_BATCH:
+                self.flush()
+
+    def thin(self):
+        """
+        Halves the rows kept, keeping every other one, and from now on only
+        records half as often.
+        """
+        n = len(TRACE_FIELDS)
+        kept = array("d")
+        for i in range(0, self.size, 2):
+            kept.extend(self.rows[i * n:(i + 1) * n])
+        self.size = len(kept) // n
+        self.rows[:len(kept)] = kept
+        if not self.improvements_only:
+            self.every *= 2
+
+    def flush(self):
+        """
+        Appends the rows held back to the stream file.
+        """
+        if self.stream_fn is None or not self.pending:
+            return
+        with open(self.stream_fn, "a", newline = "") as f:
+            csv.writer(f).writerows(self.pending)
+        self.pending = []
+
+    def truncate_stream(self):
+        """
+        Cuts the stream file back to the rows up to the last step recorded,
+        dropping any streamed after, eg. by a run since resumed from an
+        earlier checkpoint.
+        """
+        if self.stream_fn is None:
+            return
+        with open(self.stream_fn, newline = "") as f:
+            rows = list(csv.reader(f))
+        with open(self.stream_fn, "w", newline = "") as f:
+            writer = csv.writer(f)
+            writer.writerow(TRACE_FIELDS)
+            writer.writerows(row for row in rows[1:] if float(row[0]) <= self.last_step)
+
+    def __getstate__(self):
+        # only the rows filled in, to keep checkpoints small
+        state = dict(self.__dict__)
+        state["rows"] = self.rows[:self.size * len(TRACE_FIELDS)]
+        return state
+
+    def __setstate__(self, state):
+        rows = state.pop("rows")
+        self.__dict__.update(state)
+        self.rows = array("d", bytes(8 * self.capacity * len(TRACE_FIELDS)))
+        self.rows[:len(rows)] = rows
+
+    def column(self, field):
+        n = len(TRACE_FIELDS)
+        return self.rows[TRACE_FIELDS.index(field):self.size * n:n]
+
+    def save(self, fn):
+        """
+        Writes the rows kept as a CSV file, for graphing later.
+        """
+        with open(fn, "w", newline = "") as f:
+            writer = csv.writer(f)
+            writer.writerow(TRACE_FIELDS)
+            n = len(TRACE_FIELDS)
+            writer.writerows(self.rows[i * n:(i + 1) * n].tolist() for i in range(self.size))
+
+
+def load_trace(fn):
+    """
+    Reads a saved or streamed trace back in, as {field: array of values}.
+    """
+    trace = {field: array("d") for field in TRACE_FIELDS}
+    with open(fn, newline = "") as f:
+        for row in list(csv.reader(f))[1:]:
+            for field, value in zip(TRACE_FIELDS, row):
+                trace[field].append(float(value))
+    return trace
+
+def plot_traces(fns, out_fn = None):
+    """
+    Graphs the energy and best energy over the temperature of every trace
+    in fns, one line per trace, saved to out_fn if given and shown
+    otherwise.
+    """
+    import matplotlib
+    if out_fn is not None:
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, (energy_ax, best_ax) = plt.subplots(1, 2, figsize = (12, 5))
+    for fn in fns:
+        trace = load_trace(fn)
+        energy_ax.plot(trace["temp"], trace["energy"], linewidth = 0.8, label = fn)
+        best_ax.plot(trace["temp"], trace["best"], linewidth = 0.8, label = fn)
+    for ax, title in ((energy_ax, "energy over temp change"), (best_ax, "best energy over temp change")):
+        ax.set_title(title)
+        ax.set_xlabel('temperature')
+        ax.set_ylabel('energy')
+        ax.set_xscale('log')
+        ax.invert_xaxis() #cooling runs left to right
+    if len(fns) > 1:
+        best_ax.legend()
+
+    if out_fn is not None:
+        fig.savefig(out_fn)
+    else:
+        plt.show()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Graphs annealing traces saved with --trace.")
+    parser.add_argument("traces", nargs = "+", help = "trace CSV files, to compare on one graph")
+    parser.add_argument("--out", help = "save the graph to this image instead of showing it")
+    args = parser.parse_args()
+    plot_traces(args.traces, args.out)
@@ -0,0 +1,162 @@
+"""
+Warm start: repairs the current schedule instead of building a new one.
+
+When a tutor's availability changes mid-term, rerunning from scratch
+reshuffles everybody. Instead, the current MSC Tutor Schedule.xlsx is read
+back in, only the assignments the forms no longer allow are dropped (hours
+a tutor can't make anymore, tutors past their allotted hours, shifts that
+need fewer people now), and a short, cool anneal fills the holes.
+
+While repairing, every assignment that differs from the current schedule,
+whether one that was taken away or a new one, costs STABILITY_PENALTY
+points, so the search only moves people when it's worth it.
+
+If hardly any of the current schedule can be kept (eg. it's the blank
+template, or the names in it no longer match the forms), there's nothing
+worth keeping stable, and the repair starts from a new default schedule.
+"""
+import time, random
+from schedulemanager import PotentialSchedule, SLOT_HOURS
+from annealing import Annealer
+from moves import MoveSet, can_work, placed
+
+
+
+STABILITY_PENALTY = 50  #points per assignment that differs from the current schedule
+REPAIR_TEMP = 10
+REPAIR_COOLING_RATE = 0.002
+REPAIR_SECONDS = 1
+REPAIR_MOVE_WEIGHTS = {"reroll": 0, "swap": 3, "shift": 3, "gap_fill": 0, "hand_off": 1} #rerolls shuffle too much to keep
+REPAIR_MIN_KEPT = 0.1   #fraction of the shifts the kept assignments must fill, or the repair starts over
+
+
+class AnchoredSchedule(PotentialSchedule):
+    """
+    A PotentialSchedule that scores stability penalty points for every
+    assignment that differs from its anchor, the schedule it started from.
+    The count of differences is kept current as slots change, the same way
+    the rest of the score's running totals are.
+    """
+
+    def __init__(self, wc, shifts, stability = STABILITY_PENALTY, slot_hours = SLOT_HOURS):
+        super().__init__(wc, shifts, slot_hours = slot_hours)
+        self.stability = stability
+        self.anchor = set() #(name, timeslot, campus)
+        self.changes = 0
+
+    def set_anchor(self):
+        """
+        Anchors the schedule to what it holds right now.
+        """
+        self.anchor = {(worker[0], timeslot, campus)
+                       for campus in range(len(self.schedule)) for timeslot, workers in self.schedule[campus].items() for worker in workers}
+        self.changes = 0
+
+    def copy(self):
+        child = super().copy()
+        child.stability = self.stability
+        child.anchor = self.anchor
+        child.changes = self.changes
+        return child
+
+    def start_move(self):
+        super().start_move()
+        self.undo_changes = self.changes
+
+    def revert_move(self):
+        super().revert_move()
+        self.changes = self.undo_changes
+
+    def add_workers_to_slot(self, timeslot, campus, workers):
+        super().add_workers_to_slot(timeslot, campus, workers)
+        for worker in workers:
+            self.changes += -1 if (worker[0], timeslot, campus) in self.anchor else 1
+
+    def clear_slot(self, timeslot, campus):
+        removed = super().clear_slot(timeslot, campus)
+        for worker in removed:
+            self.changes += 1 if (worker[0], timeslot, campus) in self.anchor else -1
+        return removed
+
+    def evaluate(self):
+        return super().evaluate() + self.stability * self.changes
+
+
+def load_schedule(sm, fn = None, stability = STABILITY_PENALTY):
+    """
+    Reads the current schedule back in (see read_schedule_from_spreadsheet),
+    keeping every assignment the availability forms still allow, and anchors
+    it there. Returns the AnchoredSchedule, and the assignments that had to
+    be dropped as (name, timeslot, campus).
+    """
+    current = sm.read_schedule_from_spreadsheet(fn)
+    ps = AnchoredSchedule(sm.worker_capacity, sm.shifts, stability, sm.slot_hours)
+    dropped = []
+
+    for campus in range(len(sm.campuses)):
+        for timeslot, names in current[campus].items():
+            for name in names:
+                if (can_work(sm, name, timeslot, campus) and not ps.is_working(name, timeslot)
+                        and len(ps.slot_workers(timeslot, campus)) < sm.shifts[timeslot][campus]
+                        and ps.allotted_more_hours((name,))):
+                    ps.add_workers_to_slot(timeslot, campus, [placed(sm, name, timeslot)])
+                else:
+                    dropped.append((name, timeslot, campus))
+
+    ps.set_anchor()
+    return ps, dropped
+
+def fresh_start(sm, rng):
+    """
+    A new default schedule to repair from, when there's nothing to keep: an
+    AnchoredSchedule with no stability penalty.
+    """
+    default = sm.create_default_schedule(rng)
+    ps = AnchoredSchedule(sm.worker_capacity, sm.shifts, 0, sm.slot_hours)
+    for campus in range(len(sm.campuses)):
+        for timeslot, workers in default.schedule[campus].items():
+            ps.add_workers_to_slot(timeslot, campus, workers)
+    ps.set_anchor()
+    return ps
+
+def repair(sm, fn = None, temp = REPAIR_TEMP, coolingRate = REPAIR_COOLING_RATE, stability = STABILITY_PENALTY,
+           time_budget = REPAIR_SECONDS, verbose = True, **options):
+    """
+    Reads the current schedule back in and repairs it with a short anneal
+    under the stability penalty. Any other Annealer options, eg. a seed,
+    are passed on.
+
+    Returns the same as main(): the repaired schedule, its energy (without
+    the penalty), and the time taken.
+    """
+    start_time = time.perf_counter()
+
+    ps, dropped = load_schedule(sm, fn, stability)
+    anchor = ps.anchor #changes are reported against the current schedule, even when starting over
+    kept = ps.total_hours()
+    if kept < REPAIR_MIN_KEPT * sum(sum(workers_needed) for workers_needed in sm.shifts.values()):
+        if verbose:
+            print(f"Only {kept} assignments of the current schedule could be kept, so the repair starts from a new schedule instead.")
+        ps = fresh_start(sm, random.Random(options.get("seed")))
+    options.setdefault("moves", MoveSet(REPAIR_MOVE_WEIGHTS))
+
+    annealer = Annealer(sm, temp, coolingRate, ps = ps, time_budget = time_budget, **options)
+    best_schedule, best_energy, annealing_time = annealer.run()
+
+    best_schedule = PotentialSchedule(best_schedule.worker_capacity, best_schedule.shifts,
+                                      best_schedule.worker_slotted_hrs, best_schedule.schedule, best_schedule.slot_hours)
+    best_energy = best_schedule.evaluate()
+
+    t_diff = time.perf_counter() - start_time
+
+    if verbose:
+        assignments = {(worker[0], timeslot, campus) for campus in range(len(best_schedule.schedule))
+                       for timeslot, workers in best_schedule.schedule[campus].items() for worker in workers}
+        moved = {name for name, timeslot, campus in (assignments ^ anchor) | set(dropped)}
+        print(f"Dropped {len(dropped)} assignments the availability forms no longer allow.")
+        print(f"Repair completed: {annealer.stop_reason}, {len(assignments ^ anchor)} assignments changed.")
+        print(f"{len(moved)} tutors' hours changed: {', '.join(sorted(moved))}")
+        print(f"Took {t_diff} seconds.")
+        print(f"Best score was {-best_energy:.2f} points.")
+
+    return best_schedule, best_energy, t_diff
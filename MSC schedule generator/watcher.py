@@ -0,0 +1,152 @@
+"""
+Watch mode, for the week the availability forms are coming in.
+
+Instead of a run once every form is in, the availability folder is checked
+every few seconds. Forms that were added, changed or removed are read into
+the constraints in place (see ScheduleManager.update_worker_schedules),
+without a cold start, and annealing carries on in the background, one run
+after another, against the latest constraints. Every so often the best
+draft so far is written out with its report, so there's always a current
+draft to look at.
+"""
+import time, random, threading
+from schedulemanager import REPORT_FILENAME
+from annealing import Annealer
+
+
+
+WATCH_INTERVAL = 2      #seconds between looks at the availability folder
+REFRESH_INTERVAL = 30   #seconds between rewrites of the draft, while it's still improving
+
+
+class DraftOptimizer:
+    """
+    Anneals the constraints in a background thread, one run after another,
+    and keeps the best schedule found. The ScheduleManager must not change
+    while it's running: stop() it first.
+    """
+
+    def __init__(self, sm, temp = 10000, coolingRate = 0.005, seed = None, **options):
+        self.sm = sm
+        self.temp = temp
+        self.coolingRate = coolingRate
+        self.options = options
+        self.rng = random.Random(seed) #seeds each run in turn
+
+        self.lock = threading.Lock()
+        self.best_schedule = None
+        self.best_energy = float("inf")
+        self.annealer = None
+        self.runs = 0
+        self.stopping = False
+        self.error = None   #what stopped the thread, if it didn't stop cleanly
+        self.thread = threading.Thread(target = self.run, daemon = True)
+
+    def start(self):
+        self.thread.start()
+
+    def run(self):
+        try:
+            while not self.stopping:
+                self.annealer = Annealer(self.sm, self.temp, self.coolingRate, seed = self.rng.randrange(2**32), **self.options)
+                if self.stopping:
+                    break
+                best_schedule, best_energy, t_diff = self.annealer.run()
+                self.runs += 1
+                with self.lock:
+                    if best_energy < self.best_energy:
+                        self.best_schedule = best_schedule
+                        self.best_energy = best_energy
+        except Exception as e: #reported by watch(), which starts a new optimizer
+            self.error = e
+
+    def failed(self):
+        """
+        True if the thread died on an error rather than being stopped.
+        """
+        return self.error is not None and not self.thread.is_alive()
+
+    def best(self):
+        """
+        Returns (a copy of the best schedule so far, its energy), counting
+        the run still going. The schedule is None before there is one.
+        """
+        with self.lock:
+            best_schedule, best_energy = self.best_schedule, self.best_energy
+        annealer = self.annealer
+        if annealer is not None:
+            schedule, energy = annealer.best()
+            if energy < best_energy:
+                return schedule, energy
+        if best_schedule is None:
+            return None, best_energy
+        return best_schedule.copy(), best_energy
+
+    def stop(self):
+        """
+        Stops annealing, and waits for the run going to wrap up.
+        """
+        self.stopping = True
+        if self.annealer is not None:
+            self.annealer.stop()
+        self.thread.join()
+
+
+def watch(sm, schedule_fn = None, constraints_fn = None, report_fn = None, temp = 10000, coolingRate = 0.005,
+          interval = WATCH_INTERVAL, refresh = REFRESH_INTERVAL, seed = None, **options):
+    """
+    Watches the availability folder and keeps the draft schedule, the
+    constraints and the report current, until interrupted with Ctrl+C. The
+    files go where the CLI's --*-out options would put them. Any other
+    Annealer options are used for every run.
+
+    The hours of operation must already be loaded; the forms are read here.
+    """
+    report_fn = report_fn or sm.path(REPORT_FILENAME)
+    rng = random.Random(seed)
+    optimizer = None
+    written = None      #energy of the draft last written
+    last_write = -refresh
+
+    print("Watching for availability forms. Press Ctrl+C to stop.")
+    try:
+        while True:
+            try:
+                pending = any(sm.form_changes())
+            except OSError: #a form moved or deleted while looking: look again next time
+                pending = False
+
+            if pending:
+                # the constraints can only change once the optimizer has let go of them
+                if optimizer is not None:
+                    optimizer.stop()
+                    optimizer = None
+                added, changed, removed = sm.update_worker_schedules()
+                print(f"{len(added)} forms added, {len(changed)} changed, {len(removed)} removed: {len(sm.worker_capacity)} tutors in all.")
+                written = None
+                last_write = -refresh
+                sm.write_constraints_to_spreadsheet(constraints_fn)
+
+            if optimizer is not None and optimizer.failed():
+                print(f"Annealing stopped on an error, starting over: {optimizer.error!r}")
+                optimizer = None
+
+            if optimizer is None and sm.worker_capacity:
+                optimizer = DraftOptimizer(sm, temp, coolingRate, rng.randrange(2**32), **options)
+                optimizer.start()
+
+            if optimizer is not None and time.monotonic() - last_write >= refresh:
+                best_schedule, best_energy = optimizer.best()
+                if best_schedule is not None and best_energy != written:
+                    sm.write_schedule_to_spreadsheet(best_schedule, schedule_fn)
+                    best_schedule.write_report(report_fn)
+                    written = best_energy
+                    last_write = time.monotonic()
+                    print(f"Draft updated: {-best_energy:.2f} points, after {optimizer.runs} annealing runs.")
+
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("Stopped watching.")
+    finally:
+        if optimizer is not None:
+            optimizer.stop()